@@ -0,0 +1,98 @@
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "catalog:version"
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses old versions.
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        catalog_version()
+
+
+def bump_catalog_version(**kwargs):
+    """
+    Invalidate every cached catalog read by moving to a new key namespace.
+    Bumped again on commit so readers that cached pre-commit rows in between
+    do not keep them.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def catalog_validators(view, request, *args, **kwargs):
+    """Every catalog response is current for as long as the catalog version is."""
+    return f"catalog-{catalog_version()}", None
+
+
+def versioned_key(key):
+    return f"catalog:{catalog_version()}:{key}"
+
+
+def read_through(key, compute, timeout=None):
+    """
+    Return the cached value for key, computing it on a miss. Only one caller
+    per key recomputes at a time; others wait briefly for its result before
+    falling back to computing it themselves. compute() may return None for
+    results that must not be cached.
+    """
+    full_key = versioned_key(key)
+    value = cache.get(full_key)
+    if value is not None:
+        return value
+
+    lock_key = f"{full_key}:lock"
+    locked = cache.add(lock_key, 1, settings.CATALOG_CACHE_LOCK_TIMEOUT)
+    if not locked:
+        deadline = time.monotonic() + settings.CATALOG_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(full_key)
+            if value is not None:
+                return value
+
+    try:
+        value = compute()
+        if value is not None:
+            cache.set(full_key, value, settings.CATALOG_CACHE_TIMEOUT if timeout is None else timeout)
+        return value
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def cached_catalog_response(view_method):
+    """Serve successful responses of a read-only catalog view from the versioned cache."""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        uncached = []
+
+        def compute():
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                uncached.append(response)
+                return None
+            return response.data
+
+        data = read_through(request.get_full_path(), compute)
+        if uncached:
+            return uncached[0]
+        return Response(data)
+
+    return wrapper
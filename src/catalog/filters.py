@@ -0,0 +1,30 @@
+from django_filters import rest_framework as filters
+from django.db.models import Subquery
+from .models import Category, Product
+from .search import search_products
+
+
+class ProductFilter(filters.FilterSet):
+    q = filters.CharFilter(method="filter_q")
+    min_price = filters.NumberFilter(field_name="price", lookup_expr="gte")
+    max_price = filters.NumberFilter(field_name="price", lookup_expr="lte")
+    category = filters.NumberFilter(method="filter_category")
+    include_descendants = filters.BooleanFilter(method="filter_include_descendants")
+
+    class Meta:
+        model = Product
+        fields = ["q", "min_price", "max_price", "category", "include_descendants"]
+
+    def filter_q(self, queryset, name, value):
+        return search_products(queryset, value)
+
+    def filter_category(self, queryset, name, value):
+        if not self.form.cleaned_data.get("include_descendants"):
+            return queryset.filter(category_id=value)
+        # Matched against the subtree root's path inside the same query, so
+        # descendant ids are never expanded in Python.
+        root_path = Category.objects.filter(pk=value).values("path")[:1]
+        return queryset.filter(category__path__startswith=Subquery(root_path))
+
+    def filter_include_descendants(self, queryset, name, value):
+        return queryset
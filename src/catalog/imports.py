@@ -0,0 +1,116 @@
+import codecs
+import csv
+import json
+from itertools import islice
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from src.core.codes import assign_codes
+from .cache import bump_catalog_version
+from .models import Category, CategoryPriceRollup, Product
+from .serializers import ProductImportSerializer
+from .tree import ancestor_ids
+
+CSV_CONTENT_TYPES = ("text/csv",)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def read_rows(stream, content_type):
+    """
+    Yield (row_number, row) pairs from a CSV or NDJSON byte stream one line
+    at a time. Unparseable NDJSON lines are yielded with row=None.
+    """
+    lines = codecs.iterdecode(stream, "utf-8")
+    if content_type in CSV_CONTENT_TYPES:
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, {key: value for key, value in row.items() if key and value not in ("", None)}
+        return
+
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def import_chunk(rows):
+    """
+    Validate, resolve and insert one chunk of (row_number, row) pairs.
+    Returns (created_count, errors).
+    """
+    errors = []
+    valid = []
+    for number, row in rows:
+        if row is None:
+            errors.append({"row": number, "errors": {"non_field_errors": ["Invalid JSON object."]}})
+            continue
+        serializer = ProductImportSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            errors.append({"row": number, "errors": serializer.errors})
+
+    ids = {data["category"] for _, data in valid if "category" in data}
+    codes = {data["category_code"] for _, data in valid if "category_code" in data}
+    paths, ids_by_code = {}, {}
+    if valid:
+        categories = Category.objects.filter(Q(pk__in=ids) | Q(category_code__in=codes))
+        for pk, code, path in categories.values_list("id", "category_code", "path"):
+            paths[pk] = path
+            ids_by_code[code] = pk
+
+    products = []
+    numbers = []
+    for number, data in valid:
+        category_id = data["category"] if "category" in data else ids_by_code.get(data["category_code"])
+        if category_id not in paths:
+            errors.append({"row": number, "errors": {"category": ["Unknown category."]}})
+            continue
+        products.append(Product(name=data["name"], price=data["price"], category_id=category_id))
+        numbers.append(number)
+
+    if products:
+        try:
+            with transaction.atomic():
+                assign_codes(products, "product_code", "PROD")
+                Product.objects.bulk_create(products)
+                for category_id, stats in price_stats(products).items():
+                    CategoryPriceRollup.objects.add_prices(ancestor_ids(paths[category_id]), *stats)
+                bump_catalog_version()
+        except DatabaseError as e:
+            errors.extend({"row": number, "errors": {"non_field_errors": [str(e)]}} for number in numbers)
+            products = []
+
+    errors.sort(key=lambda error: error["row"])
+    return len(products), errors
+
+
+def price_stats(products):
+    """Group (sum, count, min, max) of product prices by category id."""
+    stats = {}
+    for product in products:
+        total, count, low, high = stats.get(product.category_id, (0, 0, product.price, product.price))
+        stats[product.category_id] = (
+            total + product.price, count + 1, min(low, product.price), max(high, product.price),
+        )
+    return stats
+
+
+def import_products(stream, content_type, chunk_size=500):
+    created = 0
+    errors = []
+    for chunk in chunked(read_rows(stream, content_type), chunk_size):
+        chunk_created, chunk_errors = import_chunk(chunk)
+        created += chunk_created
+        errors.extend(chunk_errors)
+    return {"created": created, "failed": len(errors), "errors": errors}
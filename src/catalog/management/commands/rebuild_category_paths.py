@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from src.catalog.models import Category
+from src.catalog.tree import rebuild_paths
+
+
+class Command(BaseCommand):
+    help = "Backfill the materialized path and depth of every category."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_paths(Category, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt paths for {count} categories"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from src.catalog.models import Category, CategoryPriceRollup, Product
+from src.catalog.rollups import rebuild_rollups, verify_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the per-subtree product price rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only compare stored rollups with live aggregates and fail on drift.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            drifted = verify_rollups(Category, Product, CategoryPriceRollup)
+            if drifted:
+                raise CommandError(f"Rollups out of date for categories: {', '.join(map(str, drifted))}")
+            self.stdout.write(self.style.SUCCESS("Price rollups match live aggregates"))
+            return
+
+        count = rebuild_rollups(Category, Product, CategoryPriceRollup, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt price rollups for {count} categories"))
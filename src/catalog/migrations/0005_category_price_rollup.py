@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from src.catalog.rollups import rebuild_rollups
+
+
+def backfill_rollups(apps, schema_editor):
+    rebuild_rollups(
+        apps.get_model("catalog", "Category"),
+        apps.get_model("catalog", "Product"),
+        apps.get_model("catalog", "CategoryPriceRollup"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_category_path"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryPriceRollup",
+            fields=[
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="price_rollup",
+                        serialize=False,
+                        to="catalog.category",
+                    ),
+                ),
+                (
+                    "price_sum",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("product_count", models.PositiveIntegerField(default=0)),
+                (
+                    "min_price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "max_price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
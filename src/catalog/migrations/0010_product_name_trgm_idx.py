@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class CreateTrigramExtension(TrigramExtension):
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # CreateExtension only checks the vendor on the way forwards.
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """
+    AddIndex that only touches PostgreSQL databases; other backends keep the
+    index in migration state only. Replaces the index of the same name that
+    the post_migrate hook used to create outside the migration graph.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(self.index.name)}")
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0009_product_stock"),
+    ]
+
+    operations = [
+        CreateTrigramExtension(),
+        AddPostgresIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="product_name_trgm_idx",
+            ),
+        ),
+    ]
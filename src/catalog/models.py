@@ -1,11 +1,19 @@
-from django.db import models
-from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models, transaction
+from django.db.models import Case, F, Max, Min, Q, Value, When
+from django.db.models.functions import Coalesce, Concat, Greatest, Least, Substr, Upper
+from src.core.codes import allocate_code
+from .cache import bump_catalog_version
+from .tree import ancestor_ids, node_path, path_depth
 
 
 class Category(models.Model):
     category_code = models.CharField(max_length=100, unique=True, null=True, blank=True)
     name = models.CharField(max_length=100)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('name', 'parent')
@@ -16,27 +24,149 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.category_code:
-            today_str = timezone.now().strftime("%Y%m%d")
-            prefix = f"CAT-{today_str}-"
+            self.category_code = allocate_code(Category, "category_code", "CAT")
 
-            last = Category.objects.filter(category_code__startswith=prefix).order_by("-category_code").first()
-            if last:
-                last_number = int(last.category_code.split("-")[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # path/depth only move through _move_subtree; writing back a copy
+            # loaded before an ancestor moved would undo that move.
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ("path", "depth")
+            ]
 
-            self.category_code = f"{prefix}{new_number:04d}"
+        with transaction.atomic():
+            if self.pk:
+                current = Category.objects.select_for_update().filter(pk=self.pk).values_list("path", "depth").first()
+                if current:
+                    self.path, self.depth = current
+            parent_path = ""
+            if self.parent_id:
+                parent_path = Category.objects.values_list("path", flat=True).get(pk=self.parent_id)
+            if self.pk and self.path and parent_path.startswith(self.path):
+                raise ValueError("A category cannot be moved under its own descendant.")
 
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
-    def get_descendants(self):
-        descendants = []
-        children = self.children.all()
-        for child in children:
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+            new_path = node_path(parent_path, self.pk)
+            if new_path != self.path:
+                self._move_subtree(new_path)
+
+    def _move_subtree(self, new_path):
+        old_path = self.path
+        new_depth = path_depth(new_path)
+        if not old_path:
+            Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            CategoryPriceRollup.objects.get_or_create(category=self)
+        else:
+            Category.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1), output_field=models.CharField()),
+                depth=F("depth") + (new_depth - self.depth),
+            )
+            subtree = CategoryPriceRollup.objects.filter(category=self).first()
+            if subtree and subtree.product_count:
+                stats = (subtree.price_sum, subtree.product_count, subtree.min_price, subtree.max_price)
+                CategoryPriceRollup.objects.remove_prices(ancestor_ids(old_path)[:-1], *stats)
+                CategoryPriceRollup.objects.add_prices(ancestor_ids(new_path)[:-1], *stats)
+        self.path = new_path
+        self.depth = new_depth
+
+    def delete(self, using=None, keep_parents=False):
+        if not self.path:
+            return super().delete(using, keep_parents)
+        return self.get_descendants(include_self=True).delete()
+
+    def get_descendants(self, include_self=False):
+        qs = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            qs = qs.exclude(pk=self.pk)
+        return qs
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for product ids: {', '.join(map(str, product_ids))}")
+
+
+class ProductManager(models.Manager):
+    # Products per stock UPDATE; each one adds an OR term and a WHEN branch.
+    stock_chunk_size = 100
+
+    def lock_stock(self, product_ids):
+        # Row locks are always taken in primary key order so checkouts over
+        # overlapping products queue behind each other instead of deadlocking.
+        return dict(
+            self.select_for_update().filter(pk__in=product_ids).order_by("pk").values_list("pk", "stock")
+        )
+
+    def lock_products(self, product_ids):
+        """{pk: product} with categories loaded, row-locked in the same order as lock_stock."""
+        products = self.select_for_update(of=("self",)).select_related("category")
+        return {product.pk: product for product in products.filter(pk__in=product_ids).order_by("pk")}
+
+    def _quantity(self, quantities):
+        return Case(
+            *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+            output_field=models.PositiveIntegerField(),
+        )
+
+    def _chunks(self, quantities):
+        items = sorted(quantities.items())
+        for start in range(0, len(items), self.stock_chunk_size):
+            yield dict(items[start:start + self.stock_chunk_size])
+
+    def reserve_stock(self, quantities):
+        """
+        Take {product_id: quantity} out of stock, all or nothing, with one
+        conditional UPDATE per stock_chunk_size products. Products whose
+        stock is NULL are not tracked.
+
+        .update() sends no post_save, so the catalog version is bumped here,
+        but only when a product sells out: invalidating on every checkout
+        would keep the catalog cache cold, so cached stock counts may lag
+        until the next catalog change while availability never does.
+        """
+        if not quantities:
+            return
+        with transaction.atomic(savepoint=False):
+            stock = self.lock_stock(quantities)
+            short = sorted(
+                pk for pk, quantity in quantities.items()
+                if pk not in stock or (stock[pk] is not None and stock[pk] < quantity)
+            )
+            if not short:
+                updated = 0
+                for chunk in self._chunks(quantities):
+                    available = Q(stock__isnull=True)
+                    for pk, quantity in chunk.items():
+                        available |= Q(pk=pk, stock__gte=quantity)
+                    updated += self.filter(pk__in=chunk).filter(available).update(
+                        stock=F("stock") - self._quantity(chunk)
+                    )
+                if updated != len(quantities):
+                    # Only reachable where the backend cannot hold the row locks;
+                    # raising here rolls the partial update back with the transaction.
+                    raise InsufficientStock(sorted(quantities))
+                if any(stock[pk] == quantity for pk, quantity in quantities.items()):
+                    bump_catalog_version()
+        # Raised outside the atomic block so a caller can still use its
+        # transaction: nothing has been written at this point.
+        if short:
+            raise InsufficientStock(short)
+
+    def release_stock(self, quantities):
+        if not quantities:
+            return
+        with transaction.atomic(savepoint=False):
+            stock = self.lock_stock(quantities)
+            for chunk in self._chunks(quantities):
+                self.filter(pk__in=chunk, stock__isnull=False).update(
+                    stock=F("stock") + self._quantity(chunk)
+                )
+            # Same rule as reserve_stock: only a product coming back into stock
+            # changes what cached catalog reads should say.
+            if any(stock.get(pk) == 0 and quantity for pk, quantity in quantities.items()):
+                bump_catalog_version()
 
 
 class Product(models.Model):
@@ -44,22 +174,112 @@ class Product(models.Model):
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products')
+    stock = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            # Serves name__icontains on PostgreSQL; only created there (see migration 0010).
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='product_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
         if not self.product_code:
-            today_str = timezone.now().strftime("%Y%m%d")
-            prefix = f"PROD-{today_str}-"
+            self.product_code = allocate_code(Product, "product_code", "PROD")
+
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # stock only moves through reserve_stock/release_stock; rewriting a
+            # copy loaded earlier would undo concurrent checkouts.
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "stock"
+            ]
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = self._stored_price_and_path()
+
+            super().save(*args, **kwargs)
+
+            price = self._meta.get_field("price").to_python(self.price)
+            # self.category may have been loaded before the category moved
+            path = Category.objects.values_list("path", flat=True).get(pk=self.category_id)
+            if previous == (price, path):
+                return
+            if previous:
+                old_price, old_path = previous
+                CategoryPriceRollup.objects.remove_prices(ancestor_ids(old_path), old_price, 1, old_price, old_price)
+            CategoryPriceRollup.objects.add_prices(ancestor_ids(path), price, 1, price, price)
+
+    def _stored_price_and_path(self):
+        """The row's price and its category's current path, locked for the rest of the transaction."""
+        return (
+            Product.objects.select_for_update(of=("self",)).filter(pk=self.pk)
+            .values_list("price", "category__path").first()
+        )
 
-            last = Product.objects.filter(product_code__startswith=prefix).order_by("-product_code").first()
-            if last:
-                last_number = int(last.product_code.split("-")[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
+    def delete(self, using=None, keep_parents=False):
+        with transaction.atomic():
+            previous = self._stored_price_and_path()
+            result = super().delete(using, keep_parents)
+            if previous:
+                price, path = previous
+                CategoryPriceRollup.objects.remove_prices(ancestor_ids(path), price, 1, price, price)
+        return result
 
-            self.product_code = f"{prefix}{new_number:04d}"
 
-        super().save(*args, **kwargs)
+class PriceRollupManager(models.Manager):
+    def add_prices(self, category_ids, total, count, min_price, max_price):
+        if not category_ids or not count:
+            return
+        self.filter(category_id__in=category_ids).update(
+            price_sum=F("price_sum") + total,
+            product_count=F("product_count") + count,
+            min_price=Least(Coalesce("min_price", Value(min_price)), Value(min_price)),
+            max_price=Greatest(Coalesce("max_price", Value(max_price)), Value(max_price)),
+        )
+
+    def remove_prices(self, category_ids, total, count, min_price, max_price):
+        if not category_ids or not count:
+            return
+        self.filter(category_id__in=category_ids).update(
+            price_sum=F("price_sum") - total,
+            product_count=F("product_count") - count,
+        )
+        # min/max cannot be decremented; only rollups whose bound came from the
+        # removed prices need a fresh subtree aggregate.
+        stale = self.filter(category_id__in=category_ids).filter(
+            Q(min_price__gte=min_price) | Q(max_price__lte=max_price)
+        ).values_list("category_id", "category__path")
+        for category_id, path in stale:
+            bounds = Product.objects.filter(category__path__startswith=path).aggregate(
+                low=Min("price"), high=Max("price"),
+            )
+            self.filter(category_id=category_id).update(min_price=bounds["low"], max_price=bounds["high"])
+
+
+class CategoryPriceRollup(models.Model):
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='price_rollup')
+    price_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    product_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    objects = PriceRollupManager()
+
+    def __str__(self):
+        return f"{self.category} ({self.product_count} products)"
+
+    @property
+    def average_price(self):
+        if not self.product_count:
+            return 0
+        return self.price_sum / self.product_count
@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from .tree import ancestor_ids
+
+
+def compute_rollups(category_paths, direct_stats):
+    """
+    Roll per-category product stats up to every ancestor.
+
+    category_paths maps category id -> materialized path, direct_stats maps
+    category id -> (sum, count, min, max) of the products filed directly
+    under it. Returns the same mapping per subtree, for every category.
+    """
+    rollups = {pk: [0, 0, None, None] for pk in category_paths}
+    for category_id, (total, count, low, high) in direct_stats.items():
+        for pk in ancestor_ids(category_paths.get(category_id, "")):
+            rollup = rollups[pk]
+            rollup[0] += total
+            rollup[1] += count
+            rollup[2] = low if rollup[2] is None else min(rollup[2], low)
+            rollup[3] = high if rollup[3] is None else max(rollup[3], high)
+    return {pk: tuple(values) for pk, values in rollups.items()}
+
+
+def live_rollups(category_model, product_model):
+    category_paths = dict(category_model.objects.values_list("id", "path"))
+    direct_stats = {
+        row["category_id"]: (row["total"], row["count"], row["low"], row["high"])
+        for row in product_model.objects.order_by().values("category_id").annotate(
+            total=Sum("price"), count=Count("id"), low=Min("price"), high=Max("price"),
+        )
+    }
+    return compute_rollups(category_paths, direct_stats)
+
+
+def rebuild_rollups(category_model, product_model, rollup_model, batch_size=500):
+    """
+    Replace every stored rollup with one computed from live aggregates.
+    Accepts historical models so migrations can reuse it.
+    """
+    rollups = live_rollups(category_model, product_model)
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        rollup_model.objects.bulk_create(
+            [
+                rollup_model(
+                    category_id=pk, price_sum=total, product_count=count, min_price=low, max_price=high,
+                )
+                for pk, (total, count, low, high) in rollups.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(rollups)
+
+
+def verify_rollups(category_model, product_model, rollup_model):
+    """Return the ids of categories whose stored rollup differs from live aggregates."""
+    expected = live_rollups(category_model, product_model)
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in rollup_model.objects.values_list(
+            "category_id", "price_sum", "product_count", "min_price", "max_price",
+        )
+    }
+    return sorted(pk for pk, values in expected.items() if stored.get(pk) != values)
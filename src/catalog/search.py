@@ -0,0 +1,51 @@
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "catalog_product_fts"
+
+SQLITE_SEARCH_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(name, content='catalog_product', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON catalog_product BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON catalog_product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name ON catalog_product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+]
+
+
+def ensure_search_index(using="default", **kwargs):
+    """
+    Keep the SQLite FTS5 name index and its sync triggers in place. Runs
+    after every migrate because SQLite drops triggers whenever a migration
+    rebuilds catalog_product. PostgreSQL's trigram index lives in the
+    catalog migrations instead.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                       [f"{FTS_TABLE}_%"])
+        if cursor.fetchone()[0] < 3:
+            for sql in SQLITE_SEARCH_SQL:
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_products(queryset, query):
+    terms = query.split()
+    if not terms:
+        return queryset
+
+    if connections[queryset.db].vendor == "sqlite":
+        match = " AND ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        )
+
+    for term in terms:
+        queryset = queryset.filter(name__icontains=term)
+    return queryset
@@ -37,6 +37,11 @@ class CategorySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "A category cannot be its own parent."
             )
+        parent = attrs.get("parent")
+        if self.instance and parent and parent.path.startswith(self.instance.path):
+            raise serializers.ValidationError(
+                "A category cannot be moved under its own descendant."
+            )
         return attrs
 
     def update(self, instance, validated_data):
@@ -50,5 +55,23 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ['id', 'product_code', 'name', 'price', 'category']
+        fields = ['id', 'product_code', 'name', 'price', 'category', 'stock']
         read_only_fields = ['id', 'product_code']
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        if "stock" in validated_data:
+            instance.save(update_fields=["stock"])
+        return instance
+
+
+class ProductImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    category = serializers.IntegerField(required=False)
+    category_code = serializers.CharField(max_length=100, required=False)
+
+    def validate(self, attrs):
+        if "category" not in attrs and "category_code" not in attrs:
+            raise serializers.ValidationError("Either category or category_code is required.")
+        return attrs
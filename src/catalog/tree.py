@@ -0,0 +1,74 @@
+PATH_SEPARATOR = "/"
+
+
+def node_path(parent_path, pk):
+    return f"{parent_path or ''}{pk}{PATH_SEPARATOR}"
+
+
+def path_depth(path):
+    return path.count(PATH_SEPARATOR) - 1
+
+
+def ancestor_ids(path):
+    """Ids on a materialized path, root first and including the node itself."""
+    return [int(pk) for pk in path.split(PATH_SEPARATOR) if pk]
+
+
+def build_paths(rows):
+    """
+    Compute the materialized path of every node from (id, parent_id) pairs
+    in a single pass over the rows. Returns {id: path}.
+    """
+    children = {}
+    for pk, parent_id in rows:
+        children.setdefault(parent_id, []).append(pk)
+
+    paths = {}
+    stack = [(pk, "") for pk in children.get(None, [])]
+    while stack:
+        pk, parent_path = stack.pop()
+        path = node_path(parent_path, pk)
+        paths[pk] = path
+        stack.extend((child, path) for child in children.get(pk, []))
+    return paths
+
+
+def rebuild_paths(model, batch_size=500):
+    """
+    Recompute path/depth for every row of the category model. Accepts the
+    historical model as well so migrations can reuse it.
+    """
+    paths = build_paths(model.objects.values_list("id", "parent_id"))
+    nodes = [model(pk=pk, path=path, depth=path_depth(path)) for pk, path in paths.items()]
+    model.objects.bulk_update(nodes, ["path", "depth"], batch_size=batch_size)
+    return len(nodes)
+
+
+def build_tree(rows, base_depth=0, max_depth=3):
+    """
+    Nest category rows (dicts with id/category_code/name/parent_id/depth)
+    in O(n), keeping the row order among siblings. Nodes more than max_depth
+    levels below the roots are reduced to {"id", "name"} and anything below
+    those is dropped, matching CategorySerializer's cutoff.
+    """
+    rows = [row for row in rows if row["depth"] - base_depth <= max_depth + 1]
+    nodes = {}
+    for row in rows:
+        if row["depth"] - base_depth > max_depth:
+            nodes[row["id"]] = {"id": row["id"], "name": row["name"]}
+        else:
+            nodes[row["id"]] = {
+                "id": row["id"],
+                "category_code": row["category_code"],
+                "name": row["name"],
+                "parent": row["parent_id"],
+                "children": [],
+            }
+
+    roots = []
+    for row in rows:
+        if row["depth"] == base_depth:
+            roots.append(nodes[row["id"]])
+        elif row["parent_id"] in nodes:
+            nodes[row["parent_id"]]["children"].append(nodes[row["id"]])
+    return roots
@@ -1,16 +1,34 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from src.core.conditional import conditional_get
+from .cache import cached_catalog_response, catalog_validators
 from .permissions import IsAdminOrReadOnly
-from django.db.models import Avg, ProtectedError
+from django.db.models import ProtectedError
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductSerializer
+from src.core.exports import EXPORT_CONTENT_TYPES, keyset_chunks, streaming_export
+from .imports import CSV_CONTENT_TYPES, NDJSON_CONTENT_TYPES, import_products
+from .filters import ProductFilter
+from .tree import build_tree
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
+    cursor_ordering = ("name", "id")
+
+    @conditional_get(catalog_validators)
+    @cached_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(catalog_validators)
+    @cached_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -23,13 +41,65 @@ class CategoryViewSet(viewsets.ModelViewSet):
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=["get"])
+    @conditional_get(catalog_validators)
+    @cached_catalog_response
+    def tree(self, request):
+        root_id = request.query_params.get("root")
+        try:
+            max_depth = int(request.query_params.get("depth", 3))
+        except ValueError:
+            max_depth = -1
+        if max_depth < 0:
+            return Response(
+                {"detail": "depth must be a non-negative integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        qs = Category.objects.all()
+        base_depth = 0
+        if root_id:
+            try:
+                root = Category.objects.get(pk=root_id)
+            except (Category.DoesNotExist, ValueError):
+                return Response(
+                    {"detail": "category not found"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            qs = qs.filter(path__startswith=root.path)
+            base_depth = root.depth
+
+        rows = qs.filter(depth__lte=base_depth + max_depth + 1).values(
+            "id", "category_code", "name", "parent_id", "depth"
+        )
+        return Response(build_tree(rows, base_depth=base_depth, max_depth=max_depth))
+
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cursor_ordering = ("name", "id")
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ProductFilter
+    max_stats_categories = 500
+    import_chunk_size = 500
+    export_chunk_size = 1000
+    export_fields = ["id", "product_code", "name", "price", "category_id"]
+
+    @conditional_get(catalog_validators)
+    @cached_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(catalog_validators)
+    @cached_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=False, methods=["get"])
+    @conditional_get(catalog_validators)
+    @cached_catalog_response
     def average_price(self, request):
         category_id = request.query_params.get("category_id")
         if not category_id:
@@ -39,27 +109,80 @@ class ProductViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            category = Category.objects.get(pk=category_id)
+            category = Category.objects.select_related("price_rollup").get(pk=category_id)
         except Category.DoesNotExist:
             return Response(
                 {"detail": "category not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        rollup = getattr(category, "price_rollup", None)
+        avg_price = rollup.average_price if rollup else 0
+        return Response({"category": category.name, "average_price": avg_price})
+
+    @action(detail=False, methods=["get"])
+    @conditional_get(catalog_validators)
+    @cached_catalog_response
+    def category_stats(self, request):
+        raw_ids = request.query_params.getlist("category_ids")
         try:
-            descendants = category.get_descendants()
-            descendant_ids = [c.id for c in descendants]
-            category_ids = [category.id] + descendant_ids
-            avg_price = (
-                Product.objects.filter(category_id__in=category_ids).aggregate(
-                    avg=Avg("price")
-                )["avg"]
-                or 0
+            category_ids = list(dict.fromkeys(
+                int(pk) for value in raw_ids for pk in value.split(",") if pk.strip()
+            ))
+        except ValueError:
+            return Response(
+                {"detail": "category_ids must be a comma separated list of integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not category_ids:
+            return Response(
+                {"detail": "category_ids required"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        except Exception as e:
+        if len(category_ids) > self.max_stats_categories:
             return Response(
-                {"detail": f"Error calculating average price: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"detail": f"at most {self.max_stats_categories} category_ids allowed"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        return Response({"category": category.name, "average_price": avg_price})
+        rows = Category.objects.filter(pk__in=category_ids).values(
+            "id", "name", "price_rollup__price_sum", "price_rollup__product_count",
+            "price_rollup__min_price", "price_rollup__max_price",
+        )
+        stats = {}
+        for row in rows:
+            total = row["price_rollup__price_sum"] or 0
+            count = row["price_rollup__product_count"] or 0
+            stats[row["id"]] = {
+                "category_id": row["id"],
+                "category": row["name"],
+                "count": count,
+                "sum": total,
+                "average_price": total / count if count else 0,
+                "min_price": row["price_rollup__min_price"],
+                "max_price": row["price_rollup__max_price"],
+            }
+        return Response([stats[pk] for pk in category_ids if pk in stats])
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_products(self, request):
+        content_type = request.content_type.split(";")[0].strip()
+        if content_type not in CSV_CONTENT_TYPES + NDJSON_CONTENT_TYPES:
+            return Response(
+                {"detail": "Upload text/csv or application/x-ndjson"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        report = import_products(request._request, content_type, chunk_size=self.import_chunk_size)
+        return Response(report, status=status.HTTP_201_CREATED if report["created"] else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {"detail": f"export_format must be one of {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        chunks = keyset_chunks(self.get_queryset(), self.export_fields, self.export_chunk_size)
+        return streaming_export(chunks, self.export_fields, export_format, "products")
@@ -1,37 +1,147 @@
+import time
+
+from django.conf import settings
 from rest_framework import authentication, exceptions
+import jwt
 import requests
 
+from .jwks import KeySetError, unverified_issuer, verify_id_token
+from .token_cache import TokenCache, token_key
 
-class GoogleOIDCAuthentication(authentication.BaseAuthentication):
-    def authenticate(self, request):
-        auth = request.headers.get("Authorization")
-        if not auth or not auth.startswith("Bearer "):
+INVALID_TOKEN = "Invalid or expired access token"
+
+token_cache = TokenCache(
+    max_entries=settings.GOOGLE_TOKEN_CACHE_MAX_ENTRIES,
+    shared_alias=settings.GOOGLE_TOKEN_SHARED_CACHE,
+)
+
+
+def token_lifetime(token_info):
+    """
+    Seconds the token stays valid according to its exp/expires_in claim, or
+    None when there is neither. Malformed values fail authentication.
+    """
+    try:
+        if "exp" in token_info:
+            return float(token_info["exp"]) - time.time()
+        if "expires_in" in token_info:
+            return float(token_info["expires_in"])
+    except (TypeError, ValueError):
+        raise exceptions.AuthenticationFailed(INVALID_TOKEN)
+    return None
+
+
+def access_token_lifetime(token):
+    """
+    Ask the tokeninfo endpoint how long an access token has left, since
+    userinfo does not say. None when it cannot tell; the cache then falls
+    back to GOOGLE_TOKEN_CACHE_SECONDS alone.
+    """
+    try:
+        resp = requests.get(settings.GOOGLE_TOKENINFO_URL, params={"access_token": token}, timeout=5)
+        if resp.status_code != 200:
             return None
+        return token_lifetime(resp.json())
+    except (requests.RequestException, ValueError, exceptions.AuthenticationFailed):
+        return None
+
+
+def bearer_token(request):
+    auth = request.headers.get("Authorization")
+    if not auth or not auth.startswith("Bearer "):
+        return None
+    return auth.split(" ", 1)[1].strip() or None
+
+
+def cached_user(key):
+    """The user a cached token resolved to, or None on a miss; raises for tokens cached as invalid."""
+    cached = token_cache.get(key)
+    if cached is None:
+        return None
+    if "error" in cached:
+        raise exceptions.AuthenticationFailed(cached["error"])
+    from django.contrib.auth import get_user_model
+    return get_user_model().objects.filter(pk=cached["user_id"]).first()
+
+
+def resolve_user(key, user_info, lifetime=None):
+    email = user_info.get("email")
+    if not email:
+        raise exceptions.AuthenticationFailed("No email in token")
+
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    user, _ = User.objects.get_or_create(email=email, defaults={
+        "first_name": user_info.get("given_name", ""),
+        "last_name": user_info.get("family_name", ""),
+    })
 
-        token = auth.split(" ", 1)[1].strip()
+    ttl = settings.GOOGLE_TOKEN_CACHE_SECONDS
+    if lifetime is not None:
+        ttl = min(ttl, lifetime)
+    token_cache.set(key, {"user_id": user.pk}, ttl)
+    return user
+
+
+class GoogleOIDCAuthentication(authentication.BaseAuthentication):
+    def authenticate(self, request):
+        token = bearer_token(request)
         if not token:
             return None
 
+        key = token_key(token)
+        user = cached_user(key)
+        if user is not None:
+            return (user, None)
+
         # Automatic userinfo authentication
-        userinfo_url = "https://openidconnect.googleapis.com/v1/userinfo"
         try:
-            resp = requests.get(userinfo_url, headers={"Authorization": f"Bearer {token}"}, timeout=5)
+            resp = requests.get(
+                settings.GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {token}"}, timeout=5,
+            )
         except requests.RequestException:
             raise exceptions.AuthenticationFailed("Failed to validate token with provider")
 
+        if resp.status_code in (400, 401, 403):
+            token_cache.set(key, {"error": INVALID_TOKEN}, settings.GOOGLE_TOKEN_NEGATIVE_CACHE_SECONDS)
+            raise exceptions.AuthenticationFailed(INVALID_TOKEN)
         if resp.status_code != 200:
-            raise exceptions.AuthenticationFailed("Invalid or expired access token")
+            # provider trouble says nothing about the token, so it is not cached
+            raise exceptions.AuthenticationFailed(INVALID_TOKEN)
+
+        try:
+            user_info = resp.json()
+        except ValueError:
+            raise exceptions.AuthenticationFailed("Failed to validate token with provider")
+        lifetime = token_lifetime(user_info)
+        if lifetime is None:
+            lifetime = access_token_lifetime(token)
+        return (resolve_user(key, user_info, lifetime), None)
 
-        user_info = resp.json()
-        email = user_info.get("email")
-        if not email:
-            raise exceptions.AuthenticationFailed("No email in token")
 
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        user, _ = User.objects.get_or_create(email=email, defaults={
-            "first_name": user_info.get("given_name", ""),
-            "last_name": user_info.get("family_name", ""),
-        })
+class GoogleIDTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Verify Google ID tokens locally against the cached JWKS instead of
+    calling userinfo. Bearer tokens that are not Google-issued JWTs are left
+    to the next authentication class.
+    """
+
+    def authenticate(self, request):
+        token = bearer_token(request)
+        if not token or unverified_issuer(token) not in settings.GOOGLE_ID_TOKEN_ISSUERS:
+            return None
+
+        key = token_key(token)
+        user = cached_user(key)
+        if user is not None:
+            return (user, None)
+
+        try:
+            claims = verify_id_token(token)
+        except KeySetError:
+            raise exceptions.AuthenticationFailed("Failed to validate token with provider")
+        except jwt.InvalidTokenError:
+            token_cache.set(key, {"error": INVALID_TOKEN}, settings.GOOGLE_TOKEN_NEGATIVE_CACHE_SECONDS)
+            raise exceptions.AuthenticationFailed(INVALID_TOKEN)
 
-        return (user, None)
+        return (resolve_user(key, claims, token_lifetime(claims)), None)
@@ -0,0 +1,120 @@
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class KeySetError(Exception):
+    pass
+
+
+class JWKSCache:
+    """
+    Signing keys from a JWKS endpoint, fetched once and kept until the
+    endpoint's Cache-Control max-age runs out. An unknown kid triggers an
+    early refresh so key rotation is picked up, but at most once per
+    min_refresh seconds so tokens with made-up kids cannot hammer the
+    endpoint.
+    """
+
+    def __init__(self, url=None, min_refresh=None, max_age=None, clock=time.monotonic):
+        self._url = url
+        self._min_refresh = min_refresh
+        self._max_age = max_age
+        self.clock = clock
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return self._url or settings.GOOGLE_JWKS_URL
+
+    @property
+    def min_refresh(self):
+        return settings.GOOGLE_JWKS_MIN_REFRESH_SECONDS if self._min_refresh is None else self._min_refresh
+
+    @property
+    def max_age(self):
+        return settings.GOOGLE_JWKS_MAX_AGE_SECONDS if self._max_age is None else self._max_age
+
+    def fetch(self):
+        try:
+            resp = requests.get(self.url, timeout=5)
+            resp.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(resp.json())
+        except (requests.RequestException, ValueError, jwt.PyJWKSetError) as exc:
+            raise KeySetError(f"Could not load signing keys: {exc}")
+        match = MAX_AGE.search(resp.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else self.max_age
+        return {key.key_id: key for key in key_set.keys if key.key_id}, max_age
+
+    def _refresh(self, now):
+        try:
+            keys, max_age = self.fetch()
+        except KeySetError:
+            if not self._keys:
+                raise
+            # keep verifying with the keys we have and retry a little later
+            self._fetched_at = now
+            self._expires_at = now + self.min_refresh
+            return
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + max_age
+
+    def get_key(self, kid):
+        with self._lock:
+            now = self.clock()
+            if now >= self._expires_at:
+                self._refresh(now)
+            elif kid not in self._keys and now - self._fetched_at >= self.min_refresh:
+                self._refresh(now)
+            key = self._keys.get(kid)
+        if key is None:
+            raise KeySetError(f"Unknown signing key {kid!r}")
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._expires_at = 0.0
+            self._fetched_at = None
+
+
+google_key_set = JWKSCache()
+
+
+def unverified_issuer(token):
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("iss")
+    except jwt.InvalidTokenError:
+        return None
+
+
+def verify_id_token(token, key_set=google_key_set):
+    """
+    Check a Google ID token's signature, issuer, audience and expiry
+    locally and return its claims. Raises jwt.InvalidTokenError or
+    KeySetError.
+    """
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = key_set.get_key(kid)
+    claims = jwt.decode(
+        token,
+        key.key,
+        algorithms=["RS256"],
+        audience=settings.GOOGLE_ID_TOKEN_AUDIENCES,
+        issuer=settings.GOOGLE_ID_TOKEN_ISSUERS,
+        leeway=settings.GOOGLE_ID_TOKEN_LEEWAY,
+        options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+    )
+    if claims.get("email_verified") is False:
+        raise jwt.InvalidTokenError("Email address is not verified")
+    return claims
@@ -0,0 +1,118 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Opaque-cursor pagination that seeks on the view's `cursor_ordering`
+    columns, so every page costs the same however deep the client goes.
+
+    DRF's CursorPagination only seeks on the first ordering column and
+    breaks ties with an OFFSET. Here the cursor carries the values of every
+    ordering column and pages start with the expanded row comparison
+    name >= %s AND (name > %s OR (name = %s AND id > %s)); the leading
+    bound lets the matching composite index seek straight to the page. The
+    ordering must therefore end in a unique column and run in one direction.
+    """
+
+    page_size_query_param = "page_size"
+    ordering = "id"
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, "cursor_ordering", self.ordering)
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+        assert len({field.startswith("-") for field in ordering}) == 1, (
+            "Keyset pagination needs every cursor_ordering column to sort in the same direction."
+        )
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        current_position = self.cursor.position if self.cursor else None
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            queryset = queryset.filter(self._seek(queryset.model, current_position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(self.page[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = True, current_position
+            self.has_previous, self.previous_position = following_position is not None, following_position
+        else:
+            self.has_next, self.next_position = following_position is not None, following_position
+            self.has_previous, self.previous_position = current_position is not None, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _seek(self, model, position, reverse):
+        names = [field.lstrip("-") for field in self.ordering]
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(names):
+                raise ValueError
+            values = [model._meta.get_field(name).to_python(value) for name, value in zip(names, values)]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+
+        after = "lt" if self.ordering[0].startswith("-") != reverse else "gt"
+        columns = list(zip(names, values))
+        name, value = columns[-1]
+        seek = Q(**{f"{name}__{after}": value})
+        for name, value in reversed(columns[:-1]):
+            seek = Q(**{f"{name}__{after}": value}) | (Q(**{name: value}) & seek)
+        if len(columns) > 1:
+            seek &= Q(**{f"{names[0]}__{after}e": values[0]})
+        return seek
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.next_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.previous_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return json.dumps(values)
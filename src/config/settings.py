@@ -76,26 +76,82 @@ DATABASES = {
     'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
 }
 
+# --- Cache ---
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "300"))
+CATALOG_CACHE_LOCK_TIMEOUT = int(os.getenv("CATALOG_CACHE_LOCK_TIMEOUT", "5"))
+
+# --- Celery / outbox ---
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-outbox': {
+        'task': 'src.core.tasks.dispatch_outbox',
+        'schedule': float(os.getenv("OUTBOX_SWEEP_SECONDS", "15")),
+    },
+    'flush-admin-digest': {
+        'task': 'src.core.tasks.flush_admin_digest_task',
+        'schedule': float(os.getenv("ADMIN_DIGEST_SWEEP_SECONDS", "60")),
+    },
+    'purge-idempotency-keys': {
+        'task': 'src.core.tasks.purge_idempotency_keys_task',
+        'schedule': float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "3600")),
+    },
+}
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "5"))
+OUTBOX_RETRY_MAX_SECONDS = int(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+
+# --- Idempotency keys ---
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "2"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
 # --- Email ---
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_PORT = os.getenv("EMAIL_PORT")
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True").lower() in ("true", "1")
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
+ADMIN_DIGEST_MAX_ORDERS = int(os.getenv("ADMIN_DIGEST_MAX_ORDERS", "20"))
+ADMIN_DIGEST_MAX_AGE_SECONDS = int(os.getenv("ADMIN_DIGEST_MAX_AGE_SECONDS", "300"))
+ADMIN_DIGEST_MAX_MESSAGES = int(os.getenv("ADMIN_DIGEST_MAX_MESSAGES", "10"))
 
 # --- Django REST Framework ---
+# "userinfo" validates Google access tokens against the userinfo endpoint,
+# "id_token" verifies Google ID tokens locally against the cached JWKS.
+GOOGLE_AUTH_MODE = os.getenv("GOOGLE_AUTH_MODE", "userinfo")
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'src.config.authentication.GoogleOIDCAuthentication',
+        'src.config.authentication.GoogleIDTokenAuthentication'
+        if GOOGLE_AUTH_MODE == "id_token"
+        else 'src.config.authentication.GoogleOIDCAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'src.config.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': int(os.getenv("API_PAGE_SIZE", "50")),
 }
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "500"))
 
 # --- Google OIDC ---
 AUTH_USER_MODEL = 'users.User'
@@ -103,11 +159,38 @@ AUTH_USER_MODEL = 'users.User'
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
+GOOGLE_USERINFO_URL = os.getenv("GOOGLE_USERINFO_URL", "https://openidconnect.googleapis.com/v1/userinfo")
+# Looked up on a cache miss for the access token's expires_in, which userinfo does not report.
+GOOGLE_TOKENINFO_URL = os.getenv("GOOGLE_TOKENINFO_URL", "https://oauth2.googleapis.com/tokeninfo")
+# Validated tokens are trusted for at most this long, and never past the expiry
+# reported by tokeninfo or the ID token. Revocation is only noticed once the
+# entry expires, so this is also the longest a revoked token keeps working.
+GOOGLE_TOKEN_CACHE_SECONDS = int(os.getenv("GOOGLE_TOKEN_CACHE_SECONDS", "300"))
+GOOGLE_TOKEN_NEGATIVE_CACHE_SECONDS = int(os.getenv("GOOGLE_TOKEN_NEGATIVE_CACHE_SECONDS", "30"))
+GOOGLE_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("GOOGLE_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Name of a CACHES alias shared between processes, or empty for in-process only.
+GOOGLE_TOKEN_SHARED_CACHE = os.getenv("GOOGLE_TOKEN_SHARED_CACHE", "")
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_JWKS_MAX_AGE_SECONDS = int(os.getenv("GOOGLE_JWKS_MAX_AGE_SECONDS", "3600"))
+GOOGLE_JWKS_MIN_REFRESH_SECONDS = int(os.getenv("GOOGLE_JWKS_MIN_REFRESH_SECONDS", "60"))
+GOOGLE_ID_TOKEN_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+GOOGLE_ID_TOKEN_AUDIENCES = [
+    audience for audience in os.getenv("GOOGLE_ID_TOKEN_AUDIENCES", GOOGLE_CLIENT_ID or "").split(",") if audience
+]
+GOOGLE_ID_TOKEN_LEEWAY = int(os.getenv("GOOGLE_ID_TOKEN_LEEWAY", "30"))
+
+# --- Code allocation ---
+CODE_ALLOCATION_BLOCK_SIZE = int(os.getenv("CODE_ALLOCATION_BLOCK_SIZE", "20"))
 
 # --- Africa's Talking ---
 AFRICA_TALKING_USERNAME = os.getenv("AFRICA_TALKING_USERNAME")
 AFRICA_TALKING_APIKEY = os.getenv("AFRICA_TALKING_APIKEY")
 AFRICA_TALKING_CODE = os.getenv("AFRICA_TALKING_CODE")
+SMS_BACKEND = os.getenv("SMS_BACKEND", "africastalking")
+SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", "10"))
+SMS_MAX_RECIPIENTS = int(os.getenv("SMS_MAX_RECIPIENTS", "100"))
+SMS_MAX_RETRIES = int(os.getenv("SMS_MAX_RETRIES", "3"))
+SMS_RETRY_BASE_SECONDS = float(os.getenv("SMS_RETRY_BASE_SECONDS", "0.5"))
 
 # --- API Docs ---
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,74 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+
+def token_key(token):
+    """Tokens are only ever kept as a digest."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCache:
+    """
+    Bounded in-process LRU of token digest -> value, with entries expiring at
+    an absolute time. When shared_alias names a Django cache, entries are
+    written through to it and local misses are filled from it, so other
+    processes skip the provider round trip as well.
+    """
+
+    def __init__(self, max_entries=10000, shared_alias="", prefix="oidc-token", clock=time.time):
+        self.max_entries = max_entries
+        self.shared_alias = shared_alias
+        self.prefix = prefix
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _remember(self, key, expires_at, value):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+
+        shared = self._shared()
+        if shared is None:
+            return None
+        entry = shared.get(f"{self.prefix}:{key}")
+        if entry is None or entry[0] <= now:
+            return None
+        self._remember(key, *entry)
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        expires_at = self.clock() + ttl
+        self._remember(key, expires_at, value)
+        shared = self._shared()
+        if shared is not None:
+            shared.set(f"{self.prefix}:{key}", (expires_at, value), timeout=math.ceil(ttl))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
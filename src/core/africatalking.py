@@ -1,34 +1,193 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
 import africastalking
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# Africa's Talking per-recipient status codes that mean the message was accepted.
+AT_SUCCESS_CODES = {100, 101, 102}
+
+
+class FakeSMSBackend:
+    """
+    In-process stand-in for africastalking.SMS. Records the last `max_sent`
+    sends, answers with an AT-shaped response and can fail the next
+    `fail_next` calls or add latency, so the sender can be exercised without
+    network access.
+    """
+
+    def __init__(self, latency=0.0, fail_next=0, max_sent=1000):
+        self.latency = latency
+        self.fail_next = fail_next
+        self.max_sent = max_sent
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, message, recipients, sender_id=None):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.fail_next:
+                self.fail_next -= 1
+                raise ConnectionError("fake AT backend unavailable")
+            self.sent.append((message, list(recipients)))
+            if len(self.sent) > self.max_sent:
+                del self.sent[:-self.max_sent]
+        return {
+            "SMSMessageData": {
+                "Message": f"Sent to {len(recipients)}/{len(recipients)} Total Cost: KES 0",
+                "Recipients": [
+                    {"number": number, "status": "Success", "statusCode": 101} for number in recipients
+                ],
+            }
+        }
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` sends per second with bursts of up to `rate`."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                self.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.updated = self.clock()
+            self.tokens -= 1
 
 
 class ATClient:
-    def __init__(self):
+    def __init__(self, backend=None, rate=None, max_recipients=None, max_retries=None, sleep=time.sleep):
+        if backend is None:
+            backend = self._default_backend()
+        self.sms = backend
+        self.max_recipients = max_recipients or settings.SMS_MAX_RECIPIENTS
+        self.max_retries = settings.SMS_MAX_RETRIES if max_retries is None else max_retries
+        self.sleep = sleep
+        self.limiter = RateLimiter(settings.SMS_RATE_PER_SECOND if rate is None else rate, sleep=sleep)
+        self.counters = {"queued": 0, "delivered": 0, "failed": 0}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_backend():
         username = settings.AFRICA_TALKING_USERNAME
         api_key = settings.AFRICA_TALKING_APIKEY
+        if settings.SMS_BACKEND == "fake":
+            return FakeSMSBackend()
+        if settings.SMS_BACKEND != "africastalking":
+            raise ImproperlyConfigured(f"Unknown SMS_BACKEND {settings.SMS_BACKEND!r}; use africastalking or fake")
         if not username or not api_key:
-            self.client = None
-            self.sms = None
-        else:
-            africastalking.initialize(username, api_key)
-            self.sms = africastalking.SMS
+            # sandbox/mock fallback, but never a silent one
+            logger.warning(
+                "SMS_BACKEND is africastalking but AFRICA_TALKING_USERNAME or AFRICA_TALKING_APIKEY "
+                "is not set; SMS will be recorded in memory and not delivered. Set SMS_BACKEND=fake "
+                "to do this on purpose."
+            )
+            return FakeSMSBackend()
+        africastalking.initialize(username, api_key)
+        return africastalking.SMS
 
-    def send_sms(self, to, message):
-        if not self.sms:
-            # sandbox/mock fallback
-            print(f"[AT MOCK] SMS to={to} message={message}")
-            return {'status': 'mocked'}
+    def queue_sms(self, to, message):
+        """
+        Queue message for every recipient not already waiting for it. Returns
+        one Future per recipient, resolved with the response of the request
+        that carried it, whichever thread flushes it.
+        """
+        recipients = to if isinstance(to, list) else [to]
+        futures = []
+        with self._lock:
+            pending = self._pending.setdefault(message, {})
+            for number in recipients:
+                if number not in pending:
+                    pending[number] = Future()
+                    self.counters["queued"] += 1
+                futures.append(pending[number])
+        return futures
 
+    def flush(self):
+        """
+        Send everything queued, one multi-recipient request per distinct
+        message body (split at max_recipients). Returns the AT responses,
+        or {'status': 'failed', ...} for requests that ran out of retries.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        results = []
         try:
-            response = self.sms.send(
-                message,
-                to if isinstance(to, list) else [to],
-                sender_id=settings.AFRICA_TALKING_CODE
-            )
-            return response
-        except Exception as e:
-            print("Error sending SMS:", e)
-            return {'status': 'failed', 'error': str(e)}
+            for message, futures in pending.items():
+                recipients = list(futures)
+                for start in range(0, len(recipients), self.max_recipients):
+                    batch = recipients[start:start + self.max_recipients]
+                    result = self._send_batch(message, batch)
+                    for number in batch:
+                        futures[number].set_result(result)
+                    results.append(result)
+        except BaseException as e:
+            # Recipients queued by other threads must not wait forever.
+            for futures in pending.values():
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(e)
+            raise
+        return results
+
+    def send_sms(self, to, message):
+        futures = self.queue_sms(to, message)
+        self.flush()
+        # A concurrent flush may have taken these recipients; wait for the
+        # responses to this message rather than whatever this flush sent.
+        results = list({id(result): result for result in (future.result() for future in futures)}.values())
+        failed = [result for result in results if result.get("status") == "failed"]
+        if failed:
+            return failed[0]
+        return results[0] if len(results) == 1 else {"status": "sent", "responses": results}
+
+    def _send_batch(self, message, recipients):
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = self.sms.send(message, recipients, sender_id=settings.AFRICA_TALKING_CODE)
+                break
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.error("SMS to %s recipients failed after %s attempts: %s", len(recipients), attempt, e)
+                    self._count(delivered=0, failed=len(recipients))
+                    return {"status": "failed", "error": str(e)}
+                delay = settings.SMS_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                self.sleep(random.uniform(0, delay))
+
+        statuses = (response or {}).get("SMSMessageData", {}).get("Recipients", [])
+        delivered = sum(1 for status in statuses if status.get("statusCode") in AT_SUCCESS_CODES)
+        self._count(delivered=delivered, failed=len(recipients) - delivered)
+        return response
+
+    def _count(self, delivered, failed):
+        with self._lock:
+            self.counters["queued"] -= delivered + failed
+            self.counters["delivered"] += delivered
+            self.counters["failed"] += failed
 
 
 africastalking_client = ATClient()
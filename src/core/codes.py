@@ -0,0 +1,97 @@
+import threading
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import CodeCounter
+
+
+class CodeAllocator:
+    """
+    Hands out "<PREFIX>-<YYYYMMDD>-<NNNN>" codes from a per-prefix, per-day
+    counter row. Each trip to the database reserves a block of numbers so
+    most allocations need no query at all; numbers left in a block are only
+    reused once the transaction that reserved them has committed, so a
+    rollback can never hand the same number out twice.
+    """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, model, field, prefix, count=1):
+        key = f"{prefix}-{timezone.now().strftime('%Y%m%d')}-"
+        numbers = self._take(key, count)
+        missing = count - len(numbers)
+        if missing:
+            block_size = self.block_size or getattr(settings, "CODE_ALLOCATION_BLOCK_SIZE", 20)
+            start, end = self._reserve(model, field, key, missing + max(block_size - 1, 0))
+            numbers.extend(range(start, start + missing))
+            if start + missing < end:
+                transaction.on_commit(lambda: self._stash(key, start + missing, end))
+        return [f"{key}{number:04d}" for number in numbers]
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+    def _take(self, key, count):
+        numbers = []
+        with self._lock:
+            blocks = self._blocks.get(key)
+            while blocks and len(numbers) < count:
+                start, end = blocks.popleft()
+                take = min(end - start, count - len(numbers))
+                numbers.extend(range(start, start + take))
+                if start + take < end:
+                    blocks.appendleft((start + take, end))
+        return numbers
+
+    def _stash(self, key, start, end):
+        with self._lock:
+            day = key[-9:]
+            for stale in [k for k in self._blocks if not k.endswith(day)]:
+                del self._blocks[stale]
+            self._blocks.setdefault(key, deque()).append((start, end))
+
+    def _reserve(self, model, field, key, count):
+        with transaction.atomic():
+            counter, _ = CodeCounter.objects.select_for_update().get_or_create(
+                key=key, defaults={"value": lambda: self._existing_max(model, field, key)},
+            )
+            start = counter.value + 1
+            counter.value += count
+            counter.save(update_fields=["value"])
+        return start, counter.value + 1
+
+    @staticmethod
+    def _existing_max(model, field, key):
+        last = (
+            model._base_manager.filter(**{f"{field}__startswith": key})
+            .order_by(f"-{field}")
+            .values_list(field, flat=True)
+            .first()
+        )
+        return int(last.split("-")[-1]) if last else 0
+
+
+code_allocator = CodeAllocator()
+
+
+def allocate_code(model, field, prefix):
+    return code_allocator.allocate(model, field, prefix)[0]
+
+
+def allocate_codes(model, field, prefix, count):
+    return code_allocator.allocate(model, field, prefix, count)
+
+
+def assign_codes(objs, field, prefix):
+    """Fill in missing codes on unsaved instances ahead of bulk_create()."""
+    pending = [obj for obj in objs if not getattr(obj, field)]
+    if pending:
+        codes = allocate_codes(type(pending[0]), field, prefix, len(pending))
+        for obj, code in zip(pending, codes):
+            setattr(obj, field, code)
+    return objs
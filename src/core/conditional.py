@@ -0,0 +1,38 @@
+from functools import wraps
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_get(validators):
+    """
+    Answer conditional GETs for a view method before it does any work.
+
+    validators(view, request, *args, **kwargs) returns (etag, last_modified)
+    cheaply, without serializing the body; last_modified is a datetime or
+    None. Matching If-None-Match / If-Modified-Since requests get a 304 and
+    successful responses carry the ETag and Last-Modified headers.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = validators(self, request, *args, **kwargs)
+            if etag is not None:
+                etag = quote_etag(etag)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if not_modified is not None:
+                return not_modified
+
+            response = view_method(self, request, *args, **kwargs)
+            if 200 <= response.status_code < 300:
+                if etag is not None:
+                    response["ETag"] = etag
+                if timestamp is not None:
+                    response["Last-Modified"] = http_date(timestamp)
+            return response
+
+        return wrapper
+
+    return decorator
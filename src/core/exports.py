@@ -0,0 +1,63 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line straight back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def keyset_chunks(queryset, fields, chunk_size=1000):
+    """
+    Yield lists of value dicts ordered by primary key, fetching each chunk
+    with "pk > last seen pk" so deep chunks cost the same as the first.
+    """
+    last_pk = None
+    while True:
+        qs = queryset.order_by("pk")
+        if last_pk is not None:
+            qs = qs.filter(pk__gt=last_pk)
+        chunk = list(qs.values("pk", *fields)[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1]["pk"]
+        for row in chunk:
+            row.pop("pk")
+        yield chunk
+
+
+def encode_rows(chunks, fields, export_format):
+    if export_format == "csv":
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for chunk in chunks:
+            yield "".join(
+                writer.writerow(
+                    json.dumps(row[field], cls=DjangoJSONEncoder) if isinstance(row[field], (list, dict))
+                    else row[field]
+                    for field in fields
+                )
+                for row in chunk
+            )
+        return
+
+    for chunk in chunks:
+        yield "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in chunk)
+
+
+def streaming_export(chunks, fields, export_format, filename):
+    response = StreamingHttpResponse(
+        encode_rows(chunks, fields, export_format),
+        content_type=EXPORT_CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.1
+
+
+def request_hash(request):
+    body = json.dumps(request.data, cls=JSONEncoder, sort_keys=True)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def claim(scope, key, digest):
+    """
+    Return (record, claimed). A key is claimed when it is new, expired, or
+    still unanswered IDEMPOTENCY_LOCK_SECONDS after it was locked; the lock
+    is never renewed, so a request running longer than that can be taken
+    over by a retry.
+    """
+    while True:
+        now = timezone.now()
+        fresh = {
+            "request_hash": digest,
+            "status_code": None,
+            "response_body": None,
+            "locked_at": now,
+            "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+        }
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(scope=scope, key=key, **fresh), True
+        except IntegrityError:
+            pass
+
+        abandoned = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        taken = IdempotencyKey.objects.filter(scope=scope, key=key).filter(
+            Q(expires_at__lte=now) | Q(status_code__isnull=True, locked_at__lte=abandoned)
+        ).update(**fresh)
+        record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+        if record is not None:
+            return record, bool(taken)
+
+
+def replay(record):
+    return Response(record.response_body, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def execute(record, view_method, view, request, *args, **kwargs):
+    # The response is stored in the same transaction as the view's writes, so
+    # a committed result always has its replay and vice versa.
+    try:
+        with transaction.atomic():
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code < 500:
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    status_code=response.status_code,
+                    response_body=json.loads(json.dumps(response.data, cls=JSONEncoder)),
+                )
+    except Exception:
+        IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+        raise
+    if response.status_code >= 500:
+        IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+    return response
+
+
+def idempotent(view_method):
+    """
+    Honour the Idempotency-Key header on a viewset action.
+
+    The first request with a key runs the action and stores its response for
+    IDEMPOTENCY_KEY_TTL_SECONDS; retries with the same body replay it without
+    running the action again. A retry arriving while the first request is
+    still running waits up to IDEMPOTENCY_WAIT_SECONDS for it and otherwise
+    gets a 409. Reusing a key with a different body is a 422. Requests that
+    raise or return a 5xx release the key so they can be retried.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = f"{self.basename}.{self.action}:{request.user.pk}"
+        digest = request_hash(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            record, claimed = claim(scope, key, digest)
+            if claimed:
+                return execute(record, view_method, self, request, *args, **kwargs)
+            if record.request_hash != digest:
+                return Response(
+                    {"detail": f"{HEADER} was already used for a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.completed:
+                return replay(record)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"detail": f"A request with this {HEADER} is still in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={"Retry-After": "1"},
+                )
+            time.sleep(POLL_SECONDS)
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size=1000):
+    """Delete expired keys in primary key batches so no single DELETE runs long."""
+    purged = 0
+    while True:
+        batch = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).values_list("pk", flat=True)[:batch_size]
+        )
+        if not batch:
+            return purged
+        purged += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from src.core.notifications import flush_admin_digest
+from src.core.outbox import dispatch_pending, outbox_stats
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox events and due admin digests (use --loop to run as a worker without Celery)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new events.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls with --loop.")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--stats", action="store_true", help="Print backlog, lag and failure counts and exit.")
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            stats = outbox_stats()
+            self.stdout.write(
+                f"pending={stats['pending']} retrying={stats['retrying']} "
+                f"failed={stats['failed']} lag_seconds={stats['lag_seconds']:.1f}"
+            )
+            return
+
+        while True:
+            delivered, failed = dispatch_pending(batch_size=options["batch_size"])
+            if delivered or failed:
+                self.stdout.write(f"delivered={delivered} failed={failed}")
+            digested = flush_admin_digest()
+            if digested:
+                self.stdout.write(f"admin_digest_orders={digested}")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -1,44 +1,127 @@
-from django.core.mail import EmailMessage
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Min, prefetch_related_objects
+from django.utils import timezone
 from .africatalking import africastalking_client
+from .models import AdminDigestEntry
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
-def notify_order_placed(order):
-    # sending SMS to customer
-    phone = order.customer.phone
+def customer_phone(customer):
+    phone = customer.phone
     if phone and phone.startswith("0"):
         phone = "+254" + phone[1:]
+    return phone
+
+
+def send_customer_sms(customer, msg):
+    result = africastalking_client.send_sms([customer_phone(customer)], msg)
+    if isinstance(result, dict) and result.get('status') == 'failed':
+        # raised so the outbox dispatcher retries the event
+        raise RuntimeError(f"SMS failed: {result.get('error')}")
+
+
+def notify_order_placed(order):
+    prefetch_related_objects([order], "items__product")
 
+    # sending SMS to customer
     msg = f"Hi {order.customer.first_name}, your order #{order.order_code} has been placed. Total: {order.total}"
+    send_customer_sms(order.customer, msg)
+
+    # admins get the order in the next digest email
+    AdminDigestEntry.objects.create(order_code=order.order_code, body=render_order_details(order))
+    try:
+        flush_admin_digest()
+    except Exception:
+        logger.exception("Admin digest flush failed; entries stay queued")
+
+
+def notify_orders_placed(customer, orders, max_listed=5):
+    """One SMS for a batch of orders; each order still gets its own admin digest entry."""
+    codes = ", ".join(f"#{order.order_code}" for order in orders[:max_listed])
+    if len(orders) > max_listed:
+        codes += f" and {len(orders) - max_listed} more"
+    total = sum(order.total for order in orders)
+    msg = f"Hi {customer.first_name}, {len(orders)} orders ({codes}) have been placed. Total: {total}"
+    send_customer_sms(customer, msg)
+
+    prefetch_related_objects(orders, "items__product")
+    AdminDigestEntry.objects.bulk_create(
+        [AdminDigestEntry(order_code=order.order_code, body=render_order_details(order)) for order in orders]
+    )
     try:
-        africastalking_client.send_sms([phone], msg)
-    except Exception as e:
-        print("SMS failed:", e)
-
-    admin_emails = list(
-        User.objects.filter(role=User.Role.ADMIN, is_active=True)
-        .exclude(email__isnull=True)
-        .exclude(email__exact="")
-        .values_list("email", flat=True)
+        flush_admin_digest()
+    except Exception:
+        logger.exception("Admin digest flush failed; entries stay queued")
+
+
+def notify_orders_status_changed(customer, order_codes, status_label, max_listed=5):
+    codes = ", ".join(f"#{code}" for code in order_codes[:max_listed])
+    if len(order_codes) > max_listed:
+        codes += f" and {len(order_codes) - max_listed} more"
+    noun = "order" if len(order_codes) == 1 else "orders"
+    verb = "is" if len(order_codes) == 1 else "are"
+    send_customer_sms(customer, f"Hi {customer.first_name}, your {noun} {codes} {verb} now {status_label.lower()}.")
+
+
+def render_order_details(order):
+    body = (
+        f"Order Code: {order.order_code}\n"
+        f"Customer name: {order.customer.first_name} {order.customer.last_name} \n"
+        f"Customer email: ({order.customer.email})\n"
+        f"Total: {order.total}\n\n"
+        "Items:\n"
     )
-    # sending email to admin
-    if admin_emails:
-        subject = f"Purchase order {order.order_code} placed"
-        body = (
-            f"New order has been placed, below are order details Code\n"
-            f"Order Code: {order.order_code}\n"
-            f"Customer name: {order.customer.first_name} {order.customer.last_name} \n"
-            f"Customer email: ({order.customer.email})\n"
-            f"Total: {order.total}\n\n"
-            "Items:\n"
+    for it in order.items.all():
+        body += f" - {it.product.name} x {it.quantity} @ {it.price}\n"
+    return body
+
+
+def flush_admin_digest(force=False):
+    """
+    Email queued orders to the admins once ADMIN_DIGEST_MAX_ORDERS are
+    waiting or the oldest has waited ADMIN_DIGEST_MAX_AGE_SECONDS. All
+    digest messages go out over one SMTP connection. Returns the number of
+    orders sent.
+    """
+    max_orders = settings.ADMIN_DIGEST_MAX_ORDERS
+    queued = AdminDigestEntry.objects.aggregate(count=Count("id"), oldest=Min("created_at"))
+    if not queued["count"]:
+        return 0
+    max_age = timedelta(seconds=settings.ADMIN_DIGEST_MAX_AGE_SECONDS)
+    if not force and queued["count"] < max_orders and queued["oldest"] > timezone.now() - max_age:
+        return 0
+
+    with transaction.atomic():
+        entries = list(
+            AdminDigestEntry.objects.select_for_update(skip_locked=True)
+            .order_by("id")[:max_orders * settings.ADMIN_DIGEST_MAX_MESSAGES]
         )
-        for it in order.items.all():
-            body += f" - {it.product.name} x {it.quantity} @ {it.price}\n"
-
-        email = EmailMessage(subject, body, to=admin_emails)
-        try:
-            email.send()
-        except Exception as e:
-            print("Email failed:", e)
+        if not entries:
+            return 0
+
+        admin_emails = list(
+            User.objects.filter(role=User.Role.ADMIN, is_active=True)
+            .exclude(email__isnull=True)
+            .exclude(email__exact="")
+            .values_list("email", flat=True)
+        )
+        if admin_emails:
+            messages = []
+            for start in range(0, len(entries), max_orders):
+                batch = entries[start:start + max_orders]
+                subject = f"{len(batch)} purchase order(s) placed: {batch[0].order_code} - {batch[-1].order_code}"
+                body = "New orders have been placed, below are the order details\n\n" + "\n".join(
+                    entry.body for entry in batch
+                )
+                messages.append(EmailMessage(subject, body, to=admin_emails))
+            get_connection().send_messages(messages)
+
+        AdminDigestEntry.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+    return len(entries)
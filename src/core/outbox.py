@@ -0,0 +1,115 @@
+import logging
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def outbox_handler(topic):
+    """Register the function that delivers events of a topic; it receives the payload."""
+
+    def decorator(func):
+        HANDLERS[topic] = func
+        return func
+
+    return decorator
+
+
+def enqueue(topic, payload):
+    """
+    Record an event in the caller's transaction. Delivery is kicked off once
+    that transaction commits; the periodic sweep picks up anything missed.
+    """
+    event = OutboxEvent.objects.create(topic=topic, payload=payload)
+    if settings.CELERY_BROKER_URL:
+        from .tasks import dispatch_outbox
+        transaction.on_commit(dispatch_outbox.delay)
+    return event
+
+
+def enqueue_many(topic, payloads):
+    """Record one event per payload with a single INSERT."""
+    events = OutboxEvent.objects.bulk_create([OutboxEvent(topic=topic, payload=payload) for payload in payloads])
+    if events and settings.CELERY_BROKER_URL:
+        from .tasks import dispatch_outbox
+        transaction.on_commit(dispatch_outbox.delay)
+    return events
+
+
+def retry_delay(attempts):
+    delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size):
+    """
+    Lease due events to this worker by pushing their available_at forward.
+    A worker that dies mid-batch lets the lease lapse and the events are
+    delivered again, so handlers must tolerate duplicates.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.Status.PENDING, available_at__lte=now)
+            .order_by("available_at", "id")[:batch_size]
+        )
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        )
+    return events
+
+
+def deliver(event):
+    handler = HANDLERS.get(event.topic)
+    event.attempts += 1
+    try:
+        if handler is None:
+            raise LookupError(f"No outbox handler registered for {event.topic}")
+        handler(event.payload)
+    except Exception as e:
+        event.last_error = f"{type(e).__name__}: {e}"
+        if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            event.status = OutboxEvent.Status.FAILED
+            logger.error("Outbox event %s failed permanently: %s", event.pk, event.last_error)
+        else:
+            event.available_at = timezone.now() + retry_delay(event.attempts)
+            logger.warning("Outbox event %s failed (attempt %s): %s", event.pk, event.attempts, event.last_error)
+        event.save(update_fields=["attempts", "status", "available_at", "last_error"])
+        return False
+
+    event.status = OutboxEvent.Status.DELIVERED
+    event.delivered_at = timezone.now()
+    event.save(update_fields=["attempts", "status", "delivered_at"])
+    return True
+
+
+def dispatch_pending(batch_size=100):
+    """Deliver due events until none are left. Returns (delivered, failed)."""
+    delivered = failed = 0
+    while events := claim_batch(batch_size):
+        for event in events:
+            if deliver(event):
+                delivered += 1
+            else:
+                failed += 1
+    return delivered, failed
+
+
+def outbox_stats():
+    now = timezone.now()
+    pending = OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING)
+    oldest = pending.aggregate(oldest=Min("created_at"))["oldest"]
+    return {
+        "pending": pending.count(),
+        "retrying": pending.filter(attempts__gt=0).count(),
+        "failed": OutboxEvent.objects.filter(status=OutboxEvent.Status.FAILED).count(),
+        "lag_seconds": (now - oldest).total_seconds() if oldest else 0,
+    }
@@ -0,0 +1,19 @@
+from celery import shared_task
+from .idempotency import purge_expired_keys
+from .notifications import flush_admin_digest
+from .outbox import dispatch_pending
+
+
+@shared_task(ignore_result=True)
+def dispatch_outbox():
+    dispatch_pending()
+
+
+@shared_task(ignore_result=True)
+def flush_admin_digest_task():
+    flush_admin_digest()
+
+
+@shared_task(ignore_result=True)
+def purge_idempotency_keys_task():
+    purge_expired_keys()
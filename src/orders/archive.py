@@ -0,0 +1,53 @@
+import time
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ArchivedOrder, ArchivedOrderProducts, Order, OrderProducts
+
+ORDER_FIELDS = ("id", "order_code", "status", "created_at", "updated_at", "customer_id", "total", "is_deleted")
+ITEM_FIELDS = ("id", "order_id", "product_id", "price", "quantity", "category_path")
+FINAL_STATUSES = (Order.Status.DELIVERED, Order.Status.CANCELED, Order.Status.RETURNED)
+
+
+def archivable_orders(cutoff=None):
+    """Soft-deleted orders, plus finished orders created before cutoff."""
+    condition = Q(is_deleted=True)
+    if cutoff is not None:
+        condition |= Q(created_at__lt=cutoff, status__in=FINAL_STATUSES)
+    return Order.all_objects.filter(condition)
+
+
+def archive_batch(cutoff=None, batch_size=500):
+    """
+    Copy one batch of archivable orders and their items to the archive
+    tables and delete them from the live ones, in one short transaction.
+    Rows another transaction holds are skipped and picked up later.
+    Returns the number of orders moved.
+    """
+    with transaction.atomic():
+        ids = list(
+            archivable_orders(cutoff).order_by("pk").select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        ArchivedOrder.objects.bulk_create(
+            [ArchivedOrder(**row) for row in Order.all_objects.filter(pk__in=ids).values(*ORDER_FIELDS)]
+        )
+        items = OrderProducts.objects.filter(order_id__in=ids).values(*ITEM_FIELDS)
+        ArchivedOrderProducts.objects.bulk_create([ArchivedOrderProducts(**row) for row in items])
+        OrderProducts.objects.filter(order_id__in=ids).delete()
+        Order.all_objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(cutoff=None, batch_size=500, pause=0):
+    archived = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
+        if pause:
+            time.sleep(pause)
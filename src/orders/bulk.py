@@ -0,0 +1,102 @@
+from collections import Counter
+
+from django.db import transaction
+
+from src.catalog.models import InsufficientStock, Product
+from src.core.codes import assign_codes
+from src.core.outbox import enqueue
+from .events import ORDERS_PLACED
+from .models import Order, OrderProducts
+from .sales import record_order_sales
+from .serializers import OrderItemSerializer
+
+
+def validate_entries(entries):
+    """Return ({index: items}, {index: errors}) for the submitted order entries."""
+    valid, errors = {}, {}
+    for index, entry in enumerate(entries):
+        serializer = OrderItemSerializer(data=entry.get("items") if isinstance(entry, dict) else None, many=True)
+        if not serializer.is_valid():
+            errors[index] = {"items": serializer.errors}
+        elif not serializer.validated_data:
+            errors[index] = {"items": ["This list may not be empty."]}
+        else:
+            valid[index] = serializer.validated_data
+    return valid, errors
+
+
+def submit_orders(customer, entries):
+    """
+    Create many orders for one customer in a fixed number of queries.
+
+    Products are read once, from the rows locked inside the transaction,
+    so prices, categories and stock all come from the same snapshot. Stock
+    is handed out in submission order, codes come from one block allocation
+    and orders and items are bulk inserted. Entries that cannot be placed
+    are reported rather than failing the batch. A single orders.placed
+    event covers the whole batch. Returns one result dict per entry, in
+    order.
+    """
+    valid, errors = validate_entries(entries)
+    product_ids = {item["product_id"] for items in valid.values() for item in items}
+
+    with transaction.atomic():
+        products = Product.objects.lock_products(product_ids)
+        stock = {pk: product.stock for pk, product in products.items()}
+        accepted, reserved = {}, Counter()
+        for index, items in valid.items():
+            missing = sorted({item["product_id"] for item in items} - products.keys())
+            if missing:
+                errors[index] = {"items": [f"Unknown product ids: {', '.join(map(str, missing))}"]}
+                continue
+            quantities = Counter()
+            for item in items:
+                quantities[item["product_id"]] += item["quantity"]
+            short = sorted(
+                pk for pk, quantity in quantities.items()
+                if stock[pk] is not None and stock[pk] - reserved[pk] < quantity
+            )
+            if short:
+                errors[index] = {"items": [str(InsufficientStock(short))]}
+                continue
+            reserved.update(quantities)
+            accepted[index] = items
+
+        orders = {
+            index: Order(
+                customer=customer,
+                total=sum(products[item["product_id"]].price * item["quantity"] for item in items),
+            )
+            for index, items in accepted.items()
+        }
+        if orders:
+            Product.objects.reserve_stock(dict(reserved))
+            Order.objects.bulk_create(assign_codes(list(orders.values()), "order_code", "ORD"))
+            order_items = [
+                OrderProducts(
+                    order=orders[index], product=products[item["product_id"]],
+                    price=products[item["product_id"]].price, quantity=item["quantity"],
+                    category_path=products[item["product_id"]].category.path,
+                )
+                for index, items in accepted.items() for item in items
+            ]
+            OrderProducts.objects.bulk_create(order_items)
+            record_order_sales(
+                (item.order.id, item.order.created_at, item.order.status, item.product_id,
+                 item.category_path, item.price, item.quantity)
+                for item in order_items
+            )
+            enqueue(ORDERS_PLACED, {"order_ids": [order.id for order in orders.values()]})
+
+    results = []
+    for index, entry in enumerate(entries):
+        reference = entry.get("reference") if isinstance(entry, dict) else None
+        if index in orders:
+            order = orders[index]
+            results.append({
+                "index": index, "reference": reference, "status": "created",
+                "id": order.id, "order_code": order.order_code, "total": order.total,
+            })
+        else:
+            results.append({"index": index, "reference": reference, "status": "failed", "errors": errors[index]})
+    return results
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from src.core.notifications import notify_order_placed, notify_orders_placed, notify_orders_status_changed
+from src.core.outbox import outbox_handler
+from .models import Order
+
+ORDER_PLACED = "order.placed"
+ORDERS_PLACED = "orders.placed"
+ORDERS_STATUS_CHANGED = "orders.status_changed"
+
+
+@outbox_handler(ORDER_PLACED)
+def deliver_order_placed(payload):
+    order = (
+        Order.objects.select_related("customer")
+        .prefetch_related("items__product")
+        .filter(pk=payload["order_id"])
+        .first()
+    )
+    if order is not None:
+        notify_order_placed(order)
+
+
+@outbox_handler(ORDERS_PLACED)
+def deliver_orders_placed(payload):
+    orders = list(
+        Order.objects.select_related("customer")
+        .prefetch_related("items__product")
+        .filter(pk__in=payload["order_ids"])
+        .order_by("pk")
+    )
+    if orders:
+        notify_orders_placed(orders[0].customer, orders)
+
+
+@outbox_handler(ORDERS_STATUS_CHANGED)
+def deliver_orders_status_changed(payload):
+    customer = get_user_model().objects.filter(pk=payload["customer_id"]).first()
+    if customer is not None:
+        notify_orders_status_changed(
+            customer, payload["order_codes"], Order.Status(payload["status"]).label,
+        )
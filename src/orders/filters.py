@@ -0,0 +1,15 @@
+from django_filters import rest_framework as filters
+from .models import Order
+
+
+class OrderFilter(filters.FilterSet):
+    created_after = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="lt")
+    status = filters.MultipleChoiceFilter(choices=Order.Status.choices, distinct=False)
+    min_total = filters.NumberFilter(field_name="total", lookup_expr="gte")
+    max_total = filters.NumberFilter(field_name="total", lookup_expr="lte")
+    customer = filters.NumberFilter(field_name="customer_id")
+
+    class Meta:
+        model = Order
+        fields = ["created_after", "created_before", "status", "min_total", "max_total", "customer"]
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from src.orders.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move soft-deleted (and optionally old finished) orders and their items to the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days", type=int,
+            help="Also archive delivered, canceled and returned orders created this many days ago or earlier.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        cutoff = None
+        if options["older_than_days"] is not None:
+            cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        archived = archive_orders(cutoff, batch_size=options["batch_size"], pause=options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders"))
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from src.catalog.models import Category, InsufficientStock, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer the stock reservation step of checkout on one hot product from "
+        "concurrent workers and report throughput, latency and overselling. "
+        "Run it against PostgreSQL; SQLite serialises writers and reports them as errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--checkouts", type=int, default=400, help="Total reservation attempts.")
+        parser.add_argument("--quantity", type=int, default=1, help="Units taken per checkout.")
+        parser.add_argument("--stock", type=int, help="Initial stock; defaults to half the demand.")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark product afterwards.")
+
+    def handle(self, *args, **options):
+        workers, checkouts, quantity = options["workers"], options["checkouts"], options["quantity"]
+        stock = options["stock"] if options["stock"] is not None else checkouts * quantity // 2
+        if workers < 1 or checkouts < 1 or quantity < 1:
+            raise CommandError("workers, checkouts and quantity must be positive")
+
+        category = Category.objects.create(name=f"Checkout benchmark {time.time_ns()}")
+        product = Product.objects.create(name="Hot SKU", price=1, category=category, stock=stock)
+        results = {"reserved": 0, "sold_out": 0, "errors": 0}
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(attempts):
+            try:
+                for _ in range(attempts):
+                    started = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            Product.objects.reserve_stock({product.pk: quantity})
+                        outcome = "reserved"
+                    except InsufficientStock:
+                        outcome = "sold_out"
+                    except DatabaseError:
+                        outcome = "errors"
+                    with lock:
+                        results[outcome] += 1
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(checkouts // workers + (i < checkouts % workers),))
+            for i in range(workers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        remaining = Product.objects.values_list("stock", flat=True).get(pk=product.pk)
+        if not options["keep"]:
+            product.delete()
+            category.delete()
+
+        latencies.sort()
+        self.stdout.write(
+            f"{checkouts} checkouts on {workers} workers in {elapsed:.2f}s "
+            f"({checkouts / elapsed:.0f}/s), p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms"
+        )
+        self.stdout.write(
+            f"reserved {results['reserved']}, sold out {results['sold_out']}, "
+            f"errors {results['errors']}, stock {stock} -> {remaining}"
+        )
+        if remaining != stock - results["reserved"] * quantity:
+            raise CommandError("Stock does not match the successful reservations")
+        self.stdout.write(self.style.SUCCESS("No overselling"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from src.orders.models import ArchivedOrderProducts, CategoryDailySales, OrderProducts, ProductDailySales
+from src.orders.sales import rebuild_sales, verify_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the daily product and category sales rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only compare stored rollups with the order items and fail on drift.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            products, categories = verify_sales(
+                OrderProducts, ProductDailySales, CategoryDailySales, archived_item_model=ArchivedOrderProducts,
+            )
+            if products or categories:
+                raise CommandError(
+                    f"Sales rollups out of date for {len(products)} product and {len(categories)} category rows"
+                )
+            self.stdout.write(self.style.SUCCESS("Sales rollups match the order items"))
+            return
+
+        count = rebuild_sales(
+            OrderProducts, ProductDailySales, CategoryDailySales,
+            batch_size=options["batch_size"], archived_item_model=ArchivedOrderProducts,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} sales rollup rows"))
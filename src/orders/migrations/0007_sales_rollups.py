@@ -0,0 +1,132 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from src.orders.sales import rebuild_sales
+
+
+def backfill_sales(apps, schema_editor):
+    rebuild_sales(
+        apps.get_model("orders", "OrderProducts"),
+        apps.get_model("orders", "ProductDailySales"),
+        apps.get_model("orders", "CategoryDailySales"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0008_category_updated_at_product_updated_at"),
+        ("orders", "0006_order_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryDailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("DELIVERED", "Delivered"),
+                            ("CANCELED", "Canceled"),
+                            ("RETURNED", "Returned"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("order_count", models.IntegerField(default=0)),
+                ("units", models.IntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="catalog.category",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["day", "status"], name="category_sales_day_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("category", "day", "status"),
+                        name="category_daily_sales_key",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductDailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("DELIVERED", "Delivered"),
+                            ("CANCELED", "Canceled"),
+                            ("RETURNED", "Returned"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("order_count", models.IntegerField(default=0)),
+                ("units", models.IntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="catalog.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["day", "status"], name="product_sales_day_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "day", "status"),
+                        name="product_daily_sales_key",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_sales, migrations.RunPython.noop),
+    ]
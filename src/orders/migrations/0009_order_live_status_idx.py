@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0008_order_archive"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["status", "-created_at", "-id"],
+                name="order_live_status_idx",
+            ),
+        ),
+    ]
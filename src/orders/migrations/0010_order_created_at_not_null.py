@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_created_at(apps, schema_editor):
+    # Orders from before created_at existed sort by when they were last
+    # touched, the closest timestamp they have.
+    Order = apps.get_model("orders", "Order")
+    Order.objects.filter(created_at__isnull=True).update(created_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0009_order_live_status_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="order",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
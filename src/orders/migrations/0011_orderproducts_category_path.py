@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_category_paths(apps, schema_editor):
+    # Existing items can only take their product's current path; rollups
+    # built from it stay consistent because rebuilds read the same column.
+    Product = apps.get_model("catalog", "Product")
+    current_path = Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("category__path")[:1])
+    for name in ("OrderProducts", "ArchivedOrderProducts"):
+        apps.get_model("orders", name).objects.update(category_path=current_path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0010_product_name_trgm_idx"),
+        ("orders", "0010_order_created_at_not_null"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderproducts",
+            name="category_path",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="archivedorderproducts",
+            name="category_path",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(snapshot_category_paths, migrations.RunPython.noop),
+    ]
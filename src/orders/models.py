@@ -1,7 +1,13 @@
-from django.db import models
-from django.utils import timezone
+from django.db import connections, models, transaction
+from django.db.models import Q
 from django.conf import settings
-from src.catalog.models import Product
+from src.catalog.models import Category, Product
+from src.core.codes import allocate_code
+
+
+class LiveOrderManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
 
 
 class Order(models.Model):
@@ -11,31 +17,60 @@ class Order(models.Model):
         CANCELED = "CANCELED", "Canceled"
         RETURNED = "RETURNED", "Returned"
 
+    RESTOCK_STATUSES = (Status.CANCELED, Status.RETURNED)
+    TRANSITIONS = {
+        Status.PENDING: (Status.DELIVERED, Status.CANCELED),
+        Status.DELIVERED: (Status.RETURNED,),
+        Status.CANCELED: (),
+        Status.RETURNED: (),
+    }
+
     order_code = models.CharField(max_length=100, unique=True, null=True, blank=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
-    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
     customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
     total = models.DecimalField(decimal_places=2, max_digits=10, default=0)
     is_deleted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = LiveOrderManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            models.Index(
+                fields=['customer', '-created_at', '-id'],
+                name='order_live_customer_idx',
+                condition=Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='order_live_status_idx',
+                condition=Q(is_deleted=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.order_code} by {self.customer}"
 
     def save(self, *args, **kwargs):
         if not self.order_code:
-            today_str = timezone.now().strftime("%Y%m%d")
-            prefix = f"ORD-{today_str}-"
+            self.order_code = allocate_code(Order, "order_code", "ORD")
 
-            last = Order.objects.filter(order_code__startswith=prefix).order_by("-order_code").first()
-            if last:
-                last_number = int(last.order_code.split("-")[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
+        if self._state.adding or self.pk is None:
+            super().save(*args, **kwargs)
+            return
 
-            self.order_code = f"{prefix}{new_number:04d}"
+        from .sales import move_order_sales
+        from .stock import move_order_stock
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = Order.all_objects.filter(pk=self.pk).values_list("status", flat=True).first()
+            super().save(*args, **kwargs)
+            if previous is not None and previous != self.status:
+                move_order_stock([self.pk], previous, self.status)
+                move_order_sales([self.pk], previous, self.status)
 
     def delete(self, using=None, keep_parents=False):
         if not getattr(self, "_hard_delete", False):
@@ -50,6 +85,133 @@ class OrderProducts(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='order_items')
     price = models.DecimalField(decimal_places=2, max_digits=10, default=0)
     quantity = models.PositiveIntegerField(default=1)
+    # The product's category path when the order was placed; the category
+    # sales rollups are keyed on it so later moves cannot make them drift.
+    category_path = models.CharField(max_length=255, default="", editable=False)
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} in {self.order.order_code}"
+
+
+class ArchivedOrder(models.Model):
+    """Orders moved out of the live table by the archive_orders command; ids are kept."""
+
+    id = models.BigIntegerField(primary_key=True)
+    order_code = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    created_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField()
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    total = models.DecimalField(decimal_places=2, max_digits=10, default=0)
+    is_deleted = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.order_code} by {self.customer} (archived)"
+
+
+class ArchivedOrderProducts(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_order_items')
+    price = models.DecimalField(decimal_places=2, max_digits=10, default=0)
+    quantity = models.PositiveIntegerField(default=1)
+    category_path = models.CharField(max_length=255, default="", editable=False)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} in {self.order.order_code} (archived)"
+
+
+class SalesRollupManager(models.Manager):
+    # Rows per statement, below PostgreSQL's 65535 bind parameter limit.
+    batch_size = 1000
+
+    def apply(self, deltas, sign=1):
+        """
+        Add (or with sign=-1 subtract) deltas mapping (day, status, key_id) ->
+        (revenue, orders, units). Each batch is a single INSERT ... ON
+        CONFLICT DO UPDATE that creates missing rows and increments existing
+        ones, so the cost grows with the number of keys and nothing else.
+        """
+        if not deltas:
+            return
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        fields = [
+            self.model._meta.get_field(name)
+            for name in ("day", "status", self.model.rollup_key, "revenue", "order_count", "units")
+        ]
+        table = quote(self.model._meta.db_table)
+        key_columns = ", ".join(quote(field.column) for field in fields[:3])
+        increments = ", ".join(
+            f"{quote(field.column)} = {table}.{quote(field.column)} + excluded.{quote(field.column)}"
+            for field in fields[3:]
+        )
+        # Rows go in key order so concurrent upserts lock shared rows in the
+        # same order and queue instead of deadlocking.
+        rows = [
+            [
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(fields, (*key, *(sign * value for value in values)))
+            ]
+            for key, values in sorted(deltas.items())
+        ]
+        batch_size = min(self.batch_size, connection.ops.bulk_batch_size(fields, rows))
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                placeholders = ", ".join(["(%s)" % ", ".join(["%s"] * len(fields))] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(quote(field.column) for field in fields)}) "
+                    f"VALUES {placeholders} ON CONFLICT ({key_columns}) DO UPDATE SET {increments}",
+                    [value for row in batch for value in row],
+                )
+
+
+class SalesRollup(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+
+    objects = SalesRollupManager()
+
+    class Meta:
+        abstract = True
+
+
+class ProductDailySales(SalesRollup):
+    rollup_key = "product"
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day', 'status'], name='product_daily_sales_key'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'status'], name='product_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.day} {self.status}: {self.revenue}"
+
+
+class CategoryDailySales(SalesRollup):
+    """Sales of every product filed anywhere under the category's subtree."""
+
+    rollup_key = "category"
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_sales')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'day', 'status'], name='category_daily_sales_key'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'status'], name='category_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id} {self.day} {self.status}: {self.revenue}"
@@ -3,4 +3,9 @@ from rest_framework import permissions
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.customer == request.user or request.user.role == "ADMIN"
+        return obj.customer_id == request.user.pk or request.user.role == "ADMIN"
+
+
+class IsAdmin(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return getattr(request.user, "role", None) == "ADMIN"
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from src.catalog.tree import ancestor_ids
+from .models import CategoryDailySales, OrderProducts, ProductDailySales
+
+ITEM_FIELDS = (
+    "order_id", "order__created_at", "order__status",
+    "product_id", "category_path", "price", "quantity",
+)
+METRICS = ("revenue", "orders", "units")
+
+
+def sales_deltas(rows, status=None):
+    """
+    Fold order item rows (tuples in ITEM_FIELDS order) into per-product and
+    per-category-subtree deltas keyed by (day, status, id). An order counts
+    once towards order_count however many of its items share a key. status
+    overrides the status stored on the rows.
+    """
+    products, categories, seen = {}, {}, set()
+    for order_id, created_at, order_status, product_id, path, price, quantity in rows:
+        if created_at is None:
+            continue
+        day = timezone.localdate(created_at)
+        order_status = status or order_status
+        keys = [(products, product_id)] + [(categories, pk) for pk in ancestor_ids(path or "")]
+        for deltas, pk in keys:
+            values = deltas.setdefault((day, order_status, pk), [0, 0, 0])
+            values[0] += price * quantity
+            values[2] += quantity
+            if (deltas is products, order_id, pk) not in seen:
+                seen.add((deltas is products, order_id, pk))
+                values[1] += 1
+    return products, categories
+
+
+def order_item_rows(item_model, order_ids=None):
+    items = item_model.objects.order_by()
+    if order_ids is not None:
+        items = items.filter(order_id__in=order_ids)
+    fields = ITEM_FIELDS
+    if not any(field.name == "category_path" for field in item_model._meta.fields):
+        # historical models from before items kept their category path
+        fields = tuple("product__category__path" if name == "category_path" else name for name in fields)
+    return items.values_list(*fields)
+
+
+def existing_categories(category_sales_model, categories):
+    """
+    Drop deltas for categories deleted since the orders were placed; their
+    rollup rows went with them and cannot be inserted again.
+    """
+    category_model = category_sales_model._meta.get_field("category").related_model
+    ids = category_model.objects.filter(pk__in={pk for _, _, pk in categories}).values_list("pk", flat=True)
+    ids = set(ids)
+    return {key: values for key, values in categories.items() if key[2] in ids}
+
+
+def record_order_sales(rows, sign=1, status=None):
+    """Apply the sales of order item rows; call inside the transaction writing the orders."""
+    products, categories = sales_deltas(rows, status)
+    ProductDailySales.objects.apply(products, sign)
+    CategoryDailySales.objects.apply(categories, sign)
+
+
+def move_order_sales(order_ids, old_status, new_status):
+    """
+    Shift the sales of orders whose status changed from one status bucket
+    to another, under the categories the items were filed in when placed.
+    """
+    rows = list(order_item_rows(OrderProducts, order_ids))
+    products, categories = sales_deltas(rows, old_status)
+    for deltas, added in zip((products, categories), sales_deltas(rows, new_status)):
+        for values in deltas.values():
+            values[:] = [-value for value in values]
+        deltas.update(added)
+    with transaction.atomic():
+        ProductDailySales.objects.apply(products)
+        CategoryDailySales.objects.apply(existing_categories(CategoryDailySales, categories))
+
+
+def live_sales(item_model, archived_item_model=None):
+    models = [item_model] if archived_item_model is None else [item_model, archived_item_model]
+    return sales_deltas(chain.from_iterable(
+        order_item_rows(model).iterator(chunk_size=2000) for model in models
+    ))
+
+
+def rebuild_sales(item_model, product_sales_model, category_sales_model, batch_size=500, archived_item_model=None):
+    """
+    Replace both sales rollups with ones computed from the order items,
+    archived ones included when given. Accepts historical models so
+    migrations can reuse it.
+    """
+    products, categories = live_sales(item_model, archived_item_model)
+    categories = existing_categories(category_sales_model, categories)
+    with transaction.atomic():
+        for model, key, deltas in (
+            (product_sales_model, "product_id", products),
+            (category_sales_model, "category_id", categories),
+        ):
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [
+                    model(day=day, status=status, revenue=revenue, order_count=orders, units=units, **{key: pk})
+                    for (day, status, pk), (revenue, orders, units) in deltas.items()
+                ],
+                batch_size=batch_size,
+            )
+    return len(products) + len(categories)
+
+
+def verify_sales(item_model, product_sales_model, category_sales_model, archived_item_model=None):
+    """Return the (day, status, id) keys of product and category rollups that drifted."""
+    drifted = []
+    products, categories = live_sales(item_model, archived_item_model)
+    for model, key, expected in (
+        (product_sales_model, "product_id", products),
+        (category_sales_model, "category_id", existing_categories(category_sales_model, categories)),
+    ):
+        stored = {
+            row[:3]: tuple(row[3:])
+            for row in model.objects.values_list("day", "status", key, "revenue", "order_count", "units")
+            if any(row[3:])
+        }
+        expected = {k: tuple(values) for k, values in expected.items() if any(values)}
+        drifted.append(sorted(k for k in stored.keys() | expected.keys() if stored.get(k) != expected.get(k)))
+    return tuple(drifted)
+
+
+def sales_window(start=None, end=None, days=30):
+    end = end or timezone.localdate()
+    return start or end - timedelta(days=days - 1), end
+
+
+def sales_timeseries(model, key_id, start, end, statuses=None):
+    rows = model.objects.filter(**{f"{model.rollup_key}_id": key_id}, day__range=(start, end))
+    if statuses:
+        rows = rows.filter(status__in=statuses)
+    return list(
+        rows.order_by("day").values("day").annotate(
+            revenue=Sum("revenue"), orders=Sum("order_count"), units=Sum("units"),
+        )
+    )
+
+
+def top_sellers(model, metric, start, end, statuses=None, limit=10, **filters):
+    key = model.rollup_key
+    rows = model.objects.filter(day__range=(start, end), **filters)
+    if statuses:
+        rows = rows.filter(status__in=statuses)
+    rows = rows.order_by().values(f"{key}_id", f"{key}__name").annotate(
+        revenue=Sum("revenue"), orders=Sum("order_count"), units=Sum("units"),
+    )
+    return [
+        {
+            "id": row[f"{key}_id"],
+            "name": row[f"{key}__name"],
+            "revenue": row["revenue"],
+            "orders": row["orders"],
+            "units": row["units"],
+        }
+        for row in rows.order_by(f"-{metric}", f"{key}_id")[:limit]
+    ]
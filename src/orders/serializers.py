@@ -1,7 +1,11 @@
+from collections import Counter
+from django.db import transaction
 from rest_framework import serializers
 from .models import Order, OrderProducts
-from src.catalog.models import Product
-from src.core.notifications import notify_order_placed
+from src.catalog.models import InsufficientStock, Product
+from src.core.outbox import enqueue
+from .events import ORDER_PLACED
+from .sales import record_order_sales
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -12,13 +16,6 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ('id', 'product_id', 'quantity', 'price')
         read_only_fields = ('price',)
 
-    def create(self, validated_data):
-        product = Product.objects.get(pk=validated_data['product_id'])
-        validated_data['price'] = product.price
-        validated_data['product'] = product
-        validated_data.pop('product_id', None)
-        return OrderProducts.objects.create(**validated_data)
-
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
@@ -28,16 +25,67 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ('id', 'order_code', 'customer', 'created_at', 'total', 'status', 'items')
         read_only_fields = ('id', 'created_at', 'total', 'status', 'order_code', 'customer')
 
+    def validate_items(self, items):
+        product_ids = {item['product_id'] for item in items}
+        products = Product.objects.select_related('category').in_bulk(product_ids)
+        missing = sorted(product_ids - products.keys())
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown product ids: {', '.join(map(str, missing))}"
+            )
+        for item in items:
+            item['product'] = products[item['product_id']]
+
+        # Cheap early rejection from the rows already loaded; create() makes
+        # the authoritative check under row locks.
+        quantities = Counter()
+        for item in items:
+            quantities[item['product_id']] += item['quantity']
+        short = sorted(
+            pk for pk, quantity in quantities.items()
+            if products[pk].stock is not None and products[pk].stock < quantity
+        )
+        if short:
+            raise serializers.ValidationError(str(InsufficientStock(short)))
+        return items
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
-        total = 0
-        for item in items_data:
-            item['order'] = order
-            oi = OrderItemSerializer().create(item)
-            total += oi.price * oi.quantity
-        order.total = total
-        order.save()
-
-        notify_order_placed(order)
+        order_items = [
+            OrderProducts(
+                product=item['product'], price=item['product'].price, quantity=item['quantity'],
+                category_path=item['product'].category.path,
+            )
+            for item in items_data
+        ]
+        total = sum(item.price * item.quantity for item in order_items)
+        quantities = Counter()
+        for item in order_items:
+            quantities[item.product_id] += item.quantity
+
+        try:
+            with transaction.atomic():
+                Product.objects.reserve_stock(quantities)
+                order = Order.objects.create(total=total, **validated_data)
+                for item in order_items:
+                    item.order = order
+                OrderProducts.objects.bulk_create(order_items)
+                record_order_sales(
+                    (order.id, order.created_at, order.status, item.product_id, item.category_path,
+                     item.price, item.quantity)
+                    for item in order_items
+                )
+                enqueue(ORDER_PLACED, {'order_id': order.id})
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({'items': [str(exc)]})
+        order._prefetched_objects_cache = {'items': order_items}
         return order
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order.Status.choices)
+    order_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=10000)
+
+
+class BulkOrderSubmissionSerializer(serializers.Serializer):
+    orders = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=500)
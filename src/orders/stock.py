@@ -0,0 +1,25 @@
+from django.db.models import Sum
+
+from src.catalog.models import Product
+from .models import Order, OrderProducts
+
+
+def ordered_quantities(order_ids):
+    return dict(
+        OrderProducts.objects.filter(order_id__in=order_ids).order_by().values("product_id").annotate(
+            quantity=Sum("quantity"),
+        ).values_list("product_id", "quantity")
+    )
+
+
+def move_order_stock(order_ids, old_status, new_status):
+    """Put stock back when orders are canceled or returned, and take it again if they are revived."""
+    was_restocked = old_status in Order.RESTOCK_STATUSES
+    restocked = new_status in Order.RESTOCK_STATUSES
+    if was_restocked == restocked:
+        return
+    quantities = ordered_quantities(order_ids)
+    if restocked:
+        Product.objects.release_stock(quantities)
+    else:
+        Product.objects.reserve_stock(quantities)
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.utils import timezone
+
+from src.core.outbox import enqueue_many
+from .events import ORDERS_STATUS_CHANGED
+from .models import Order
+from .sales import move_order_sales
+from .stock import move_order_stock
+
+BATCH_SIZE = 1000
+
+
+def bulk_transition(order_ids, new_status, batch_size=BATCH_SIZE):
+    """
+    Move orders to new_status where Order.TRANSITIONS allows it. Each batch
+    locks its orders, then issues one UPDATE per current status together with
+    the matching stock and sales adjustments. Customers get one event covering
+    all of their changed orders. Returns {order_id: result} with result one of
+    "updated", "unchanged", "invalid_transition" or "not_found".
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    results = dict.fromkeys(order_ids, "not_found")
+    changed = {}
+    now = timezone.now()
+
+    with transaction.atomic():
+        for start in range(0, len(order_ids), batch_size):
+            batch = order_ids[start:start + batch_size]
+            rows = (
+                Order.objects.select_for_update().filter(pk__in=batch)
+                .order_by("pk").values_list("pk", "status", "customer_id", "order_code")
+            )
+            by_status = {}
+            for pk, status, customer_id, order_code in rows:
+                if status == new_status:
+                    results[pk] = "unchanged"
+                elif new_status not in Order.TRANSITIONS[status]:
+                    results[pk] = "invalid_transition"
+                else:
+                    results[pk] = "updated"
+                    by_status.setdefault(status, []).append(pk)
+                    changed.setdefault(customer_id, []).append(order_code)
+
+            for old_status, pks in by_status.items():
+                Order.objects.filter(pk__in=pks).update(status=new_status, updated_at=now)
+                move_order_stock(pks, old_status, new_status)
+                move_order_sales(pks, old_status, new_status)
+
+        enqueue_many(ORDERS_STATUS_CHANGED, [
+            {"customer_id": customer_id, "status": new_status, "order_codes": codes}
+            for customer_id, codes in changed.items()
+        ])
+    return results
@@ -1,21 +1,71 @@
-from rest_framework import viewsets
+from datetime import date
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.permissions import IsAuthenticated
-from .models import Order
-from .serializers import OrderSerializer
-from .permissions import IsOwnerOrAdmin
+from rest_framework.response import Response
+from django.db.models import Count, Max
+from django_filters.rest_framework import DjangoFilterBackend
+from src.core.conditional import conditional_get
+from src.core.exports import EXPORT_CONTENT_TYPES, keyset_chunks, streaming_export
+from src.core.idempotency import idempotent
+from .filters import OrderFilter
+from .models import CategoryDailySales, Order, OrderProducts, ProductDailySales
+from .sales import METRICS, sales_timeseries, sales_window, top_sellers
+from .bulk import submit_orders
+from .serializers import BulkOrderSubmissionSerializer, BulkStatusSerializer, OrderSerializer
+from .transitions import bulk_transition
+from .permissions import IsAdmin, IsOwnerOrAdmin
+
+
+def order_list_validators(view, request, *args, **kwargs):
+    stats = view.filter_queryset(view.get_queryset()).aggregate(last=Max("updated_at"), count=Count("id"))
+    last = stats["last"]
+    return f"orders-{request.user.pk}-{stats['count']}-{last.timestamp() if last else 0}", last
+
+
+def order_detail_validators(view, request, pk=None, **kwargs):
+    try:
+        last = view.get_queryset().filter(pk=pk).values_list("updated_at", flat=True).first()
+    except ValueError:
+        last = None
+    if last is None:
+        return None, None
+    return f"order-{pk}-{last.timestamp()}", last
 
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
+    cursor_ordering = ("-created_at", "-id")
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
+    export_chunk_size = 1000
+    export_fields = ["id", "order_code", "customer_id", "status", "created_at", "total"]
+    analytics_max_days = 366
+    analytics_max_limit = 100
 
     def get_queryset(self):
-        qs = Order.objects.filter(is_deleted=False)
+        qs = Order.objects.all()
         if self.request.user.role != "ADMIN":
             qs = qs.filter(customer=self.request.user)
+        if self.action in ("list", "retrieve"):
+            qs = qs.prefetch_related("items")
         return qs
 
+    @conditional_get(order_list_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(order_detail_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
 
@@ -24,3 +74,112 @@ class OrderViewSet(viewsets.ModelViewSet):
             instance.delete(hard=True)
         else:
             instance.delete()
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {"detail": f"export_format must be one of {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        chunks = self._with_items(
+            keyset_chunks(self.filter_queryset(self.get_queryset()), self.export_fields, self.export_chunk_size)
+        )
+        return streaming_export(chunks, self.export_fields + ["items"], export_format, "orders")
+
+    def _with_items(self, chunks):
+        for chunk in chunks:
+            items = {}
+            rows = OrderProducts.objects.filter(order_id__in=[row["id"] for row in chunk]).order_by("pk").values(
+                "order_id", "product_id", "quantity", "price"
+            )
+            for item in rows:
+                items.setdefault(item.pop("order_id"), []).append(item)
+            for row in chunk:
+                row["items"] = items.get(row["id"], [])
+            yield chunk
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    @idempotent
+    def bulk_submit(self, request):
+        serializer = BulkOrderSubmissionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = submit_orders(request.user, serializer.validated_data["orders"])
+        created = sum(result["status"] == "created" for result in results)
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=["post"], url_path="bulk-status",
+            permission_classes=[IsAuthenticated, IsAdmin])
+    def bulk_status(self, request):
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_transition(serializer.validated_data["order_ids"], serializer.validated_data["status"])
+        return Response({
+            "status": serializer.validated_data["status"],
+            "updated": sum(result == "updated" for result in results.values()),
+            "results": [{"id": pk, "result": result} for pk, result in results.items()],
+        })
+
+    def _analytics_window(self, request):
+        try:
+            start, end = (
+                date.fromisoformat(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ("start", "end")
+            )
+        except ValueError:
+            raise ParseError("start and end must be YYYY-MM-DD dates")
+        start, end = sales_window(start, end)
+        if start > end or (end - start).days >= self.analytics_max_days:
+            raise ParseError(f"start must be before end and at most {self.analytics_max_days} days apart")
+
+        statuses = [value for value in request.query_params.get("status", "").split(",") if value]
+        unknown = set(statuses) - set(Order.Status.values)
+        if unknown:
+            raise ParseError(f"Unknown status: {', '.join(sorted(unknown))}")
+        return start, end, statuses
+
+    @action(detail=False, methods=["get"], url_path="analytics/timeseries",
+            permission_classes=[IsAuthenticated, IsAdmin])
+    def analytics_timeseries(self, request):
+        start, end, statuses = self._analytics_window(request)
+        product, category = request.query_params.get("product"), request.query_params.get("category")
+        if bool(product) == bool(category):
+            raise ParseError("Exactly one of product or category is required")
+        model, key_id = (ProductDailySales, product) if product else (CategoryDailySales, category)
+        if not key_id.isdigit():
+            raise ParseError(f"{model.rollup_key} must be an integer id")
+
+        return Response({
+            "start": start,
+            "end": end,
+            "results": sales_timeseries(model, int(key_id), start, end, statuses),
+        })
+
+    @action(detail=False, methods=["get"], url_path="analytics/top",
+            permission_classes=[IsAuthenticated, IsAdmin])
+    def analytics_top(self, request):
+        start, end, statuses = self._analytics_window(request)
+        by = request.query_params.get("by", "product")
+        metric = request.query_params.get("metric", "revenue")
+        if by not in ("product", "category"):
+            raise ParseError("by must be product or category")
+        if metric not in METRICS:
+            raise ParseError(f"metric must be one of {', '.join(METRICS)}")
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), self.analytics_max_limit)
+        except ValueError:
+            raise ParseError("limit must be an integer")
+
+        filters = {}
+        if by == "category" and request.query_params.get("depth", "").isdigit():
+            filters["category__depth"] = int(request.query_params["depth"])
+        model = ProductDailySales if by == "product" else CategoryDailySales
+        return Response({
+            "start": start,
+            "end": end,
+            "results": top_sellers(model, metric, start, end, statuses, max(limit, 1), **filters),
+        })
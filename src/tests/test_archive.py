@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from src.catalog.models import Category, Product
+from src.orders.models import ArchivedOrder, ArchivedOrderProducts, Order, OrderProducts
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customer():
+    return User.objects.create_user(email="buyer@test.com", phone="0715000000")
+
+
+@pytest.fixture
+def product():
+    return Product.objects.create(name="Bread", price=50, category=Category.objects.create(name="Bakery"))
+
+
+def place_order(customer, product, quantity=1):
+    client = APIClient()
+    client.force_authenticate(customer)
+    response = client.post(
+        reverse("order-list"), {"items": [{"product_id": product.id, "quantity": quantity}]}, format="json",
+    )
+    return Order.objects.get(pk=response.data["id"])
+
+
+def test_default_manager_hides_soft_deleted_orders(customer, product):
+    live, deleted = place_order(customer, product), place_order(customer, product)
+    deleted.delete()
+
+    assert list(Order.objects.all()) == [live]
+    assert Order.all_objects.count() == 2
+    assert list(customer.orders.all()) == [live]
+
+
+def test_archive_moves_deleted_orders_and_items_in_batches(customer, product):
+    live = place_order(customer, product)
+    deleted = [place_order(customer, product, quantity=i + 1) for i in range(5)]
+    for order in deleted:
+        order.delete()
+
+    call_command("archive_orders", "--batch-size", "2")
+
+    assert list(Order.all_objects.all()) == [live]
+    assert list(OrderProducts.objects.values_list("order_id", flat=True)) == [live.id]
+    assert sorted(ArchivedOrder.objects.values_list("id", flat=True)) == [order.id for order in deleted]
+    archived = ArchivedOrder.objects.get(pk=deleted[2].id)
+    assert archived.order_code == deleted[2].order_code and archived.is_deleted
+    assert [item.quantity for item in archived.items.all()] == [3]
+    assert ArchivedOrderProducts.objects.count() == 5
+
+
+def test_archive_old_finished_orders_keeps_sales_rollups_rebuildable(customer, product):
+    old_delivered, old_pending, recent_delivered = (place_order(customer, product) for _ in range(3))
+    for order in (old_delivered, recent_delivered):
+        order.status = Order.Status.DELIVERED
+        order.save()
+    Order.objects.filter(pk__in=[old_delivered.pk, old_pending.pk]).update(
+        created_at=timezone.now() - timedelta(days=400),
+    )
+    call_command("rebuild_sales_rollups")
+
+    call_command("archive_orders", "--older-than-days", "365")
+
+    assert list(ArchivedOrder.objects.values_list("id", flat=True)) == [old_delivered.id]
+    assert set(Order.objects.values_list("id", flat=True)) == {old_pending.id, recent_delivered.id}
+    call_command("rebuild_sales_rollups", "--verify")
@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from src.catalog.cache import catalog_version
+from src.catalog.models import Category, Product
+from src.core.models import AdminDigestEntry, OutboxEvent
+from src.core.outbox import dispatch_pending
+from src.orders.events import ORDERS_PLACED
+from src.orders.models import CategoryDailySales, Order, OrderProducts, ProductDailySales
+from src.orders.sales import verify_sales
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def partner():
+    return User.objects.create_user(email="wholesale@test.com", phone="0717000000", first_name="Wholesale")
+
+
+@pytest.fixture
+def client(partner):
+    client = APIClient()
+    client.force_authenticate(partner)
+    return client
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name="Bakery")
+
+
+def submit(client, orders, **extra):
+    return client.post(reverse("order-bulk-submit"), {"orders": orders}, format="json", **extra)
+
+
+def test_bulk_submission_reports_each_order(client, partner, category, settings, mocker):
+    settings.ADMIN_DIGEST_MAX_ORDERS = 100
+    bread = Product.objects.create(name="Bread", price=50, category=category, stock=5)
+    milk = Product.objects.create(name="Milk", price=80, category=category)
+
+    response = submit(client, [
+        {"reference": "po-1", "items": [{"product_id": bread.id, "quantity": 3}, {"product_id": milk.id, "quantity": 1}]},
+        {"reference": "po-2", "items": [{"product_id": 999, "quantity": 1}]},
+        {"reference": "po-3", "items": []},
+        {"reference": "po-4", "items": [{"product_id": bread.id, "quantity": 3}]},
+        {"reference": "po-5", "items": [{"product_id": bread.id, "quantity": "many"}]},
+        {"reference": "po-6", "items": [{"product_id": bread.id, "quantity": 2}]},
+    ])
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert (response.data["created"], response.data["failed"]) == (2, 4)
+    results = response.data["results"]
+    assert [(row["reference"], row["status"]) for row in results] == [
+        ("po-1", "created"), ("po-2", "failed"), ("po-3", "failed"),
+        ("po-4", "failed"), ("po-5", "failed"), ("po-6", "created"),
+    ]
+    assert results[0]["total"] == Decimal("230.00")
+    assert "Unknown product ids: 999" in str(results[1]["errors"])
+    assert f"Insufficient stock for product ids: {bread.id}" in str(results[3]["errors"])
+    assert "quantity" in str(results[4]["errors"])
+
+    created = Order.objects.filter(customer=partner).order_by("pk")
+    assert [order.order_code for order in created] == [results[0]["order_code"], results[5]["order_code"]]
+    assert OrderProducts.objects.count() == 3
+    assert Product.objects.get(pk=bread.pk).stock == 0
+    assert ProductDailySales.objects.get(product=bread).units == 5
+
+    assert OutboxEvent.objects.filter(topic=ORDERS_PLACED).count() == 1
+    send_sms = mocker.patch("src.core.notifications.africastalking_client.send_sms", return_value={"status": "ok"})
+    assert dispatch_pending() == (1, 0)
+    send_sms.assert_called_once()
+    assert "2 orders" in send_sms.call_args[0][1]
+    assert AdminDigestEntry.objects.count() == 2
+
+
+def test_all_failed_batch_is_a_bad_request(client):
+    response = submit(client, [{"items": [{"product_id": 999, "quantity": 1}]}])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["failed"] == 1
+    assert not Order.objects.exists()
+
+
+def test_bulk_submission_query_count_is_independent_of_batch_size(client, category):
+    products = [Product.objects.create(name=f"Bun {i}", price=i + 1, category=category) for i in range(10)]
+
+    def batch(size):
+        return [
+            {"items": [{"product_id": products[i % 10].id, "quantity": 1}, {"product_id": products[0].id, "quantity": 2}]}
+            for i in range(size)
+        ]
+
+    submit(client, batch(1))
+    with CaptureQueriesContext(connection) as small:
+        submit(client, batch(3))
+    # 180 items stay inside one INSERT under SQLite's 999-parameter limit
+    with CaptureQueriesContext(connection) as large:
+        response = submit(client, batch(90))
+
+    assert response.data["created"] == 90
+    assert len(large) == len(small)
+
+
+def test_bulk_submission_at_the_batch_limit(client, category):
+    products = Product.objects.bulk_create(
+        [Product(name=f"Roll {i}", price=2, category=category, stock=1) for i in range(1500)]
+    )
+    orders = [
+        {"reference": f"po-{i}", "items": [{"product_id": product.id, "quantity": 1} for product in products[i * 3:i * 3 + 3]]}
+        for i in range(498)
+    ]
+    # both remaining entries ask for stock the first order already took
+    orders += [{"reference": f"late-{i}", "items": [{"product_id": products[0].id, "quantity": 1}]} for i in range(2)]
+    version = catalog_version()
+
+    response = submit(client, orders)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert (response.data["created"], response.data["failed"]) == (498, 2)
+    assert Order.objects.count() == 498
+    assert list(Product.objects.filter(stock=0).order_by("pk").values_list("pk", flat=True)) == [
+        product.id for product in products[:1494]
+    ]
+    assert verify_sales(OrderProducts, ProductDailySales, CategoryDailySales) == ([], [])
+    assert catalog_version() != version
+
+
+def test_bulk_submission_honours_idempotency_key(client, category):
+    bread = Product.objects.create(name="Bread", price=50, category=category)
+    orders = [{"items": [{"product_id": bread.id, "quantity": 1}]}] * 3
+
+    first = submit(client, orders, HTTP_IDEMPOTENCY_KEY="batch-42")
+    second = submit(client, orders, HTTP_IDEMPOTENCY_KEY="batch-42")
+
+    assert second.data == first.data
+    assert Order.objects.count() == 3
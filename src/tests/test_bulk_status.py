@@ -0,0 +1,149 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from src.catalog.cache import catalog_version
+from src.catalog.models import Category, Product
+from src.core.models import OutboxEvent
+from src.core.outbox import dispatch_pending
+from src.orders.events import ORDERS_STATUS_CHANGED
+from src.orders.models import CategoryDailySales, Order, OrderProducts, ProductDailySales
+from src.orders.sales import rebuild_sales, verify_sales
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def admin_client():
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(email="admin@test.com", phone="0714000000", role="ADMIN"))
+    return client
+
+
+@pytest.fixture
+def buyers():
+    return [
+        User.objects.create_user(email=f"buyer{i}@test.com", phone=f"071400001{i}", first_name=f"Buyer{i}")
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def product():
+    return Product.objects.create(name="Bread", price=50, category=Category.objects.create(name="Bakery"), stock=10)
+
+
+def place_order(customer, product, quantity=1):
+    client = APIClient()
+    client.force_authenticate(customer)
+    response = client.post(
+        reverse("order-list"), {"items": [{"product_id": product.id, "quantity": quantity}]}, format="json",
+    )
+    return Order.objects.get(pk=response.data["id"])
+
+
+def bulk_status(client, new_status, order_ids):
+    return client.post(reverse("order-bulk-status"), {"status": new_status, "order_ids": order_ids}, format="json")
+
+
+def test_bulk_status_is_admin_only(buyers):
+    client = APIClient()
+    client.force_authenticate(buyers[0])
+
+    assert bulk_status(client, "DELIVERED", [1]).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_bulk_status_reports_per_order_results(admin_client, buyers, product, mocker):
+    first, second = place_order(buyers[0], product), place_order(buyers[0], product)
+    other = place_order(buyers[1], product)
+    delivered = Order.objects.create(customer=buyers[1], status=Order.Status.DELIVERED)
+    canceled = Order.objects.create(customer=buyers[1], status=Order.Status.CANCELED)
+    deleted = Order.objects.create(customer=buyers[1], is_deleted=True)
+    OutboxEvent.objects.all().delete()
+
+    ids = [first.id, delivered.id, canceled.id, 9999, deleted.id, second.id, other.id, first.id]
+    response = bulk_status(admin_client, "DELIVERED", ids)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["updated"] == 3
+    assert [(row["id"], row["result"]) for row in response.data["results"]] == [
+        (first.id, "updated"),
+        (delivered.id, "unchanged"),
+        (canceled.id, "invalid_transition"),
+        (9999, "not_found"),
+        (deleted.id, "not_found"),
+        (second.id, "updated"),
+        (other.id, "updated"),
+    ]
+    first.refresh_from_db()
+    assert first.status == Order.Status.DELIVERED
+    assert first.updated_at > first.created_at
+
+    events = OutboxEvent.objects.filter(topic=ORDERS_STATUS_CHANGED).order_by("payload__customer_id")
+    assert [event.payload["order_codes"] for event in events] == [
+        [first.order_code, second.order_code], [other.order_code],
+    ]
+
+    send_sms = mocker.patch("src.core.notifications.africastalking_client.send_sms", return_value={"status": "ok"})
+    assert dispatch_pending() == (2, 0)
+    assert send_sms.call_count == 2
+    assert f"your orders #{first.order_code}, #{second.order_code} are now delivered" in send_sms.call_args_list[0][0][1]
+
+
+def test_bulk_cancel_restocks_and_moves_sales(admin_client, buyers, product):
+    orders = [place_order(buyers[0], product, quantity=2) for _ in range(3)]
+    assert Product.objects.get(pk=product.pk).stock == 4
+
+    bulk_status(admin_client, "CANCELED", [order.id for order in orders])
+
+    assert Product.objects.get(pk=product.pk).stock == 10
+    assert verify_sales(OrderProducts, ProductDailySales, CategoryDailySales) == ([], [])
+    assert ProductDailySales.objects.get(status="CANCELED").units == 6
+
+
+def test_bulk_status_query_count_is_independent_of_order_count(admin_client, buyers, product):
+    def make_orders(count):
+        orders = [Order.objects.create(customer=buyers[i % 2]) for i in range(count)]
+        OrderProducts.objects.bulk_create(
+            [OrderProducts(order=order, product=product, price=product.price) for order in orders]
+        )
+        return [order.id for order in orders]
+
+    few, many = make_orders(3), make_orders(60)
+    with CaptureQueriesContext(connection) as small:
+        bulk_status(admin_client, "DELIVERED", few)
+    with CaptureQueriesContext(connection) as large:
+        response = bulk_status(admin_client, "DELIVERED", many)
+
+    assert response.data["updated"] == 60
+    assert len(large) == len(small)
+
+
+def test_bulk_cancel_at_full_batch_size(admin_client, buyers):
+    food = Category.objects.create(name="Food")
+    shelves = [Category.objects.create(name=f"Shelf {i}", parent=food) for i in range(3)]
+    products = Product.objects.bulk_create([
+        Product(name=f"Item {i}", price=1, category=shelves[i % 3], stock=0) for i in range(3600)
+    ])
+    orders = Order.objects.bulk_create([Order(customer=buyers[i % 2], total=3) for i in range(1200)])
+    OrderProducts.objects.bulk_create([
+        OrderProducts(order=order, product=product, price=1, quantity=1, category_path=product.category.path)
+        for index, order in enumerate(orders) for product in products[index * 3:index * 3 + 3]
+    ])
+    rebuild_sales(OrderProducts, ProductDailySales, CategoryDailySales)
+    version = catalog_version()
+
+    response = bulk_status(admin_client, "CANCELED", [order.id for order in orders])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["updated"] == 1200
+    assert set(Product.objects.values_list("stock", flat=True)) == {1}
+    assert verify_sales(OrderProducts, ProductDailySales, CategoryDailySales) == ([], [])
+    assert CategoryDailySales.objects.get(category=food, status="CANCELED").units == 3600
+    assert catalog_version() != version
@@ -1,7 +1,17 @@
+import json
+import threading
 import pytest
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
-from src.catalog.models import Category, Product
+from src.catalog.cache import read_through, versioned_key
+from src.catalog.models import Category, CategoryPriceRollup, Product
+from src.catalog.rollups import verify_rollups
+from src.catalog.views import ProductViewSet
 from src.orders.models import Order
 from django.contrib.auth import get_user_model
 
@@ -57,7 +67,7 @@ def test_list_categories(api_client, category):
     url = reverse("category-list")
     response = api_client.get(url)
     assert response.status_code == 200
-    assert response.data[0]["name"] == "Bakery"
+    assert response.data["results"][0]["name"] == "Bakery"
 
 
 def test_delete_category_with_products_fails(api_client, admin_user, product):
@@ -76,13 +86,193 @@ def test_delete_category_without_products(api_client, admin_user):
     assert response.status_code == 204
 
 
+def test_category_paths_track_reparenting(category):
+    child = Category.objects.create(name="Bread", parent=category)
+    grandchild = Category.objects.create(name="Rye", parent=child)
+    other = Category.objects.create(name="Dairy")
+
+    assert grandchild.path == f"{category.id}/{child.id}/{grandchild.id}/"
+    assert grandchild.depth == 2
+    assert set(category.get_descendants()) == {child, grandchild}
+
+    child.parent = other
+    child.save()
+    grandchild.refresh_from_db()
+
+    assert grandchild.path == f"{other.id}/{child.id}/{grandchild.id}/"
+    assert list(category.get_descendants()) == []
+    assert set(other.get_descendants()) == {child, grandchild}
+
+
+def test_saving_a_stale_category_keeps_its_moved_path(category):
+    child = Category.objects.create(name="Bread", parent=category)
+    grandchild = Category.objects.create(name="Rye", parent=child)
+    Product.objects.create(name="Loaf", price=40, category=grandchild)
+    other = Category.objects.create(name="Dairy")
+    stale = Category.objects.get(pk=grandchild.pk)
+
+    child.parent = other
+    child.save()
+    stale.name = "Dark Rye"
+    stale.save()
+
+    grandchild.refresh_from_db()
+    assert (grandchild.name, grandchild.path) == ("Dark Rye", f"{other.id}/{child.id}/{grandchild.id}/")
+    assert CategoryPriceRollup.objects.get(category=other).product_count == 1
+    assert CategoryPriceRollup.objects.get(category=category).product_count == 0
+    assert verify_rollups(Category, Product, CategoryPriceRollup) == []
+
+
+def test_cannot_move_category_under_descendant(api_client, admin_user, category):
+    child = Category.objects.create(name="Bread", parent=category)
+    api_client.force_authenticate(user=admin_user)
+    url = reverse("category-detail", args=[category.id])
+    response = api_client.patch(url, {"parent": child.id}, format="json")
+    assert response.status_code == 400
+
+
+def test_delete_category_removes_subtree(api_client, admin_user, category):
+    child = Category.objects.create(name="Bread", parent=category)
+    Category.objects.create(name="Rye", parent=child)
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.delete(reverse("category-detail", args=[category.id]))
+    assert response.status_code == 204
+    assert Category.objects.count() == 0
+
+
+def test_rebuild_category_paths_command(category):
+    child = Category.objects.create(name="Bread", parent=category)
+    Category.objects.update(path="", depth=0)
+
+    call_command("rebuild_category_paths", stdout=StringIO())
+
+    child.refresh_from_db()
+    assert child.path == f"{category.id}/{child.id}/"
+    assert child.depth == 1
+
+
+def test_category_tree_matches_serializer(api_client, category):
+    node = category
+    for i in range(5):
+        node = Category.objects.create(name=f"Level {i + 1}", parent=node)
+    Category.objects.create(name="Dairy")
+
+    response = api_client.get(reverse("category-tree"))
+    assert response.status_code == 200
+    listed = api_client.get(reverse("category-detail", args=[category.id])).data
+
+    tree = {root["name"]: root for root in response.data}
+    assert set(tree) == {"Bakery", "Dairy"}
+    assert tree["Bakery"] == listed
+
+
+def test_category_tree_single_query(api_client, category, django_assert_num_queries):
+    for i in range(20):
+        child = Category.objects.create(name=f"Child {i}", parent=category)
+        Category.objects.create(name="Leaf", parent=child)
+
+    with django_assert_num_queries(1):
+        response = api_client.get(reverse("category-tree"))
+    assert len(response.data[0]["children"]) == 20
+
+
+def test_category_tree_root_and_depth(api_client, category):
+    child = Category.objects.create(name="Cakes", parent=category)
+    grandchild = Category.objects.create(name="Cupcakes", parent=child)
+    Category.objects.create(name="Vanilla", parent=grandchild)
+
+    response = api_client.get(reverse("category-tree"), {"root": child.id, "depth": 0})
+    assert response.status_code == 200
+    assert len(response.data) == 1
+    assert response.data[0]["name"] == "Cakes"
+    assert response.data[0]["children"] == [{"id": grandchild.id, "name": "Cupcakes"}]
+
+    response = api_client.get(reverse("category-tree"), {"root": 999})
+    assert response.status_code == 404
+
+
 # ----------------- PRODUCT TESTS -----------------
 
 def test_list_products(api_client, product):
     url = reverse("product-list")
     response = api_client.get(url)
     assert response.status_code == 200
-    assert response.data[0]["name"] == "Bread"
+    assert response.data["results"][0]["name"] == "Bread"
+
+
+def test_list_products_cursor_pagination(api_client, category):
+    for name in ["Bagel", "Croissant", "Bagel", "Donut", "Eclair"]:
+        Product.objects.create(name=name, price=10, category=category)
+
+    names = []
+    url = reverse("product-list")
+    params = {"page_size": 2}
+    while url:
+        response = api_client.get(url, params)
+        assert len(response.data["results"]) <= 2
+        names.extend(row["name"] for row in response.data["results"])
+        url, params = response.data["next"], None
+
+    assert names == ["Bagel", "Bagel", "Croissant", "Donut", "Eclair"]
+
+
+def test_cursor_seeks_past_runs_of_duplicate_names(api_client, category):
+    for i in range(7):
+        Product.objects.create(name="Bagel" if i < 5 else f"Bun {i}", price=10, category=category)
+    expected = list(Product.objects.order_by("name", "id").values_list("id", flat=True))
+
+    pages, url, params = [], reverse("product-list"), {"page_size": 2}
+    while url:
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, params)
+        assert not any("OFFSET" in query["sql"] for query in queries)
+        pages.append(response.data)
+        url, params = response.data["next"], None
+
+    assert [row["id"] for page in pages for row in page["results"]] == expected
+    previous = api_client.get(pages[-1]["previous"])
+    assert [row["id"] for row in previous.data["results"]] == expected[4:6]
+
+
+def test_page_size_is_capped(api_client, category, settings):
+    settings.API_MAX_PAGE_SIZE = 3
+    for i in range(5):
+        Product.objects.create(name=f"Bun {i}", price=10, category=category)
+    response = api_client.get(reverse("product-list"), {"page_size": 100})
+    assert len(response.data["results"]) == 3
+
+
+def test_search_products_by_name_and_price(api_client, category):
+    Product.objects.create(name="Sourdough Bread", price=120, category=category)
+    Product.objects.create(name="Rye Bread", price=80, category=category)
+    cake = Product.objects.create(name="Carrot Cake", price=300, category=category)
+    cake.name = "Carrot Loaf"
+    cake.save()
+
+    url = reverse("product-list")
+    names = lambda params: [row["name"] for row in api_client.get(url, params).data["results"]]  # noqa: E731
+
+    assert names({"q": "bread"}) == ["Rye Bread", "Sourdough Bread"]
+    assert names({"q": "sour bre"}) == ["Sourdough Bread"]
+    assert names({"q": "loaf"}) == ["Carrot Loaf"]
+    assert names({"q": "cake"}) == []
+    assert names({"min_price": 100, "max_price": 200}) == ["Sourdough Bread"]
+
+
+def test_filter_products_by_category_subtree(api_client, category, django_assert_num_queries):
+    child = Category.objects.create(name="Cakes", parent=category)
+    grandchild = Category.objects.create(name="Cupcakes", parent=child)
+    Product.objects.create(name="Cookie", price=100, category=category)
+    Product.objects.create(name="Sponge", price=200, category=child)
+    Product.objects.create(name="Vanilla", price=300, category=grandchild)
+
+    url = reverse("product-list")
+    response = api_client.get(url, {"category": child.id})
+    assert [row["name"] for row in response.data["results"]] == ["Sponge"]
+
+    with django_assert_num_queries(1):
+        response = api_client.get(url, {"category": child.id, "include_descendants": "1"})
+    assert [row["name"] for row in response.data["results"]] == ["Sponge", "Vanilla"]
 
 
 def test_average_price_no_category(api_client):
@@ -110,6 +300,237 @@ def test_average_price_success(api_client, category):
     assert response.data["average_price"] == pytest.approx(150.0)
 
 
+def test_average_price_includes_subcategories(api_client, category):
+    child = Category.objects.create(name="Cakes", parent=category)
+    grandchild = Category.objects.create(name="Cupcakes", parent=child)
+    Product.objects.create(name="Cookie", price=100, category=category)
+    Product.objects.create(name="Sponge", price=200, category=child)
+    Product.objects.create(name="Vanilla", price=300, category=grandchild)
+
+    url = reverse("product-average-price")
+    response = api_client.get(url, {"category_id": child.id})
+    assert response.status_code == 200
+    assert response.data["average_price"] == pytest.approx(250.0)
+
+
+def test_price_rollups_follow_product_changes(category):
+    child = Category.objects.create(name="Cakes", parent=category)
+    other = Category.objects.create(name="Dairy")
+    cheap = Product.objects.create(name="Cookie", price=100, category=category)
+    cake = Product.objects.create(name="Sponge", price=300, category=child)
+
+    rollup = CategoryPriceRollup.objects.get(category=category)
+    assert (rollup.price_sum, rollup.product_count, rollup.min_price, rollup.max_price) == (400, 2, 100, 300)
+
+    cheap.price = 150
+    cheap.save()
+    cake.category = other
+    cake.save()
+    rollup.refresh_from_db()
+    assert (rollup.price_sum, rollup.product_count, rollup.min_price, rollup.max_price) == (150, 1, 150, 150)
+    assert CategoryPriceRollup.objects.get(category=other).product_count == 1
+
+    cheap.delete()
+    rollup.refresh_from_db()
+    assert (rollup.price_sum, rollup.product_count, rollup.min_price, rollup.max_price) == (0, 0, None, None)
+    assert verify_rollups(Category, Product, CategoryPriceRollup) == []
+
+
+def test_price_rollups_ignore_a_stale_related_category(category):
+    child = Category.objects.create(name="Cakes", parent=category)
+    other = Category.objects.create(name="Dairy")
+    Product.objects.create(name="Sponge", price=300, category=child)
+    stale = Product.objects.select_related("category").get(name="Sponge")
+
+    child.parent = other
+    child.save()
+    stale.price = 350
+    stale.save()
+    assert CategoryPriceRollup.objects.get(category=other).price_sum == 350
+    assert verify_rollups(Category, Product, CategoryPriceRollup) == []
+
+    stale.delete()
+    assert CategoryPriceRollup.objects.get(category=other).product_count == 0
+    assert verify_rollups(Category, Product, CategoryPriceRollup) == []
+
+
+def test_price_rollups_follow_category_reparenting(category):
+    child = Category.objects.create(name="Cakes", parent=category)
+    other = Category.objects.create(name="Dairy")
+    Product.objects.create(name="Sponge", price=300, category=child)
+
+    child.parent = other
+    child.save()
+
+    assert CategoryPriceRollup.objects.get(category=category).product_count == 0
+    assert CategoryPriceRollup.objects.get(category=other).price_sum == 300
+    assert verify_rollups(Category, Product, CategoryPriceRollup) == []
+
+
+def test_average_price_is_single_query(api_client, category, django_assert_num_queries):
+    Product.objects.create(name="Cookie", price=100, category=category)
+    url = reverse("product-average-price")
+    with django_assert_num_queries(1):
+        response = api_client.get(url, {"category_id": category.id})
+    assert response.data["average_price"] == pytest.approx(100.0)
+
+
+def test_rebuild_price_rollups_command(category, product):
+    CategoryPriceRollup.objects.all().delete()
+    with pytest.raises(CommandError):
+        call_command("rebuild_price_rollups", "--verify", stdout=StringIO())
+
+    call_command("rebuild_price_rollups", stdout=StringIO())
+    call_command("rebuild_price_rollups", "--verify", stdout=StringIO())
+    assert CategoryPriceRollup.objects.get(category=category).price_sum == product.price
+
+
+def test_category_stats_batch(api_client, category, django_assert_num_queries):
+    child = Category.objects.create(name="Cakes", parent=category)
+    empty = Category.objects.create(name="Dairy")
+    Product.objects.create(name="Cookie", price=100, category=category)
+    Product.objects.create(name="Sponge", price=300, category=child)
+
+    url = reverse("product-category-stats")
+    with django_assert_num_queries(1):
+        response = api_client.get(url, {"category_ids": f"{child.id},{category.id},{empty.id},999"})
+
+    assert response.status_code == 200
+    assert [row["category_id"] for row in response.data] == [child.id, category.id, empty.id]
+    parent_stats = response.data[1]
+    assert parent_stats["count"] == 2
+    assert parent_stats["sum"] == 400
+    assert parent_stats["average_price"] == pytest.approx(200.0)
+    assert (parent_stats["min_price"], parent_stats["max_price"]) == (100, 300)
+    assert response.data[2]["count"] == 0
+
+
+def test_category_stats_requires_ids(api_client):
+    url = reverse("product-category-stats")
+    assert api_client.get(url).status_code == 400
+    assert api_client.get(url, {"category_ids": "1,abc"}).status_code == 400
+
+
+def test_bulk_import_products_csv(api_client, admin_user, category):
+    child = Category.objects.create(name="Cakes", parent=category)
+    api_client.force_authenticate(user=admin_user)
+    body = (
+        "name,price,category,category_code\n"
+        f"Sourdough,120.50,{category.id},\n"
+        f"Sponge,300,,{child.category_code}\n"
+        "Mystery,10,999,\n"
+        f"Broken,abc,{category.id},\n"
+    )
+
+    response = api_client.generic("POST", reverse("product-import-products"), body, content_type="text/csv")
+
+    assert response.status_code == 201
+    assert response.data["created"] == 2
+    assert [error["row"] for error in response.data["errors"]] == [3, 4]
+    assert "category" in response.data["errors"][0]["errors"]
+    assert "price" in response.data["errors"][1]["errors"]
+    assert Product.objects.filter(product_code__isnull=False).count() == 2
+    assert verify_rollups(Category, Product, CategoryPriceRollup) == []
+
+
+def test_bulk_import_products_ndjson_in_chunks(
+    api_client, admin_user, category, monkeypatch, django_assert_max_num_queries
+):
+    monkeypatch.setattr(ProductViewSet, "import_chunk_size", 20)
+    api_client.force_authenticate(user=admin_user)
+    lines = [json.dumps({"name": f"Bun {i}", "price": i + 1, "category": category.id}) for i in range(50)]
+    body = "\n".join(lines[:10] + ["{not json"] + lines[10:])
+
+    with django_assert_max_num_queries(40):
+        response = api_client.generic(
+            "POST", reverse("product-import-products"), body, content_type="application/x-ndjson"
+        )
+
+    assert response.data["created"] == 50
+    assert response.data["errors"] == [
+        {"row": 11, "errors": {"non_field_errors": ["Invalid JSON object."]}}
+    ]
+    assert CategoryPriceRollup.objects.get(category=category).product_count == 50
+
+
+def test_bulk_import_requires_admin(api_client, customer_user, category):
+    api_client.force_authenticate(user=customer_user)
+    response = api_client.generic(
+        "POST", reverse("product-import-products"), "name,price,category\n", content_type="text/csv"
+    )
+    assert response.status_code == 403
+
+
+def test_export_products_streams_in_keyset_chunks(api_client, category, monkeypatch, django_assert_num_queries):
+    monkeypatch.setattr(ProductViewSet, "export_chunk_size", 2)
+    for i in range(5):
+        Product.objects.create(name=f"Bun {i}", price=i + 1, category=category)
+
+    response = api_client.get(reverse("product-export"))
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    with django_assert_num_queries(4):
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    assert [row["name"] for row in rows] == [f"Bun {i}" for i in range(5)]
+    assert rows[0]["category_id"] == category.id
+
+
+def test_export_products_csv(api_client, product):
+    response = api_client.get(reverse("product-export"), {"export_format": "csv"})
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert lines[0] == "id,product_code,name,price,category_id"
+    assert lines[1].startswith(f"{product.id},{product.product_code},Bread,")
+
+    assert api_client.get(reverse("product-export"), {"export_format": "xml"}).status_code == 400
+
+
+def test_catalog_reads_are_cached_until_catalog_changes(api_client, product, django_assert_num_queries):
+    url = reverse("product-detail", args=[product.id])
+    assert api_client.get(url).data["name"] == "Bread"
+
+    with django_assert_num_queries(0):
+        assert api_client.get(url).data["name"] == "Bread"
+
+    product.name = "Rye"
+    product.save()
+    assert api_client.get(url).data["name"] == "Rye"
+
+
+def test_error_responses_are_not_cached(api_client, django_assert_num_queries):
+    url = reverse("product-average-price")
+    assert api_client.get(url, {"category_id": 999}).status_code == 404
+    with django_assert_num_queries(1):
+        assert api_client.get(url, {"category_id": 999}).status_code == 404
+
+
+def test_read_through_waits_for_in_flight_computation(settings):
+    settings.CATALOG_CACHE_LOCK_TIMEOUT = 2
+    key = versioned_key("/api/products/")
+    cache.add(f"{key}:lock", 1)
+    threading.Timer(0.1, cache.set, args=(key, ["fresh"])).start()
+
+    def compute():
+        raise AssertionError("should not recompute while another worker holds the lock")
+
+    assert read_through("/api/products/", compute) == ["fresh"]
+
+
+def test_catalog_conditional_get(api_client, product, django_assert_num_queries):
+    url = reverse("product-detail", args=[product.id])
+    etag = api_client.get(url)["ETag"]
+
+    with django_assert_num_queries(0):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    product.price = 60
+    product.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
 # ----------------- PERMISSION TESTS -----------------
 
 def test_admin_can_access_any_user(api_client, admin_user, customer_user):
@@ -0,0 +1,60 @@
+import pytest
+from django.utils import timezone
+
+from src.catalog.models import Category, Product
+from src.core.codes import CodeAllocator, assign_codes, code_allocator
+from src.core.models import CodeCounter
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def reset_allocator():
+    code_allocator.reset()
+    yield
+    code_allocator.reset()
+
+
+@pytest.fixture
+def prefix():
+    return f"PROD-{timezone.now().strftime('%Y%m%d')}-"
+
+
+def test_codes_are_unique_and_prefixed(prefix):
+    category = Category.objects.create(name="Bakery")
+    products = [Product.objects.create(name=f"Bread {i}", price=50, category=category) for i in range(5)]
+
+    codes = [p.product_code for p in products]
+    assert len(set(codes)) == 5
+    assert all(code.startswith(prefix) for code in codes)
+    assert category.category_code.startswith("CAT-")
+
+
+def test_committed_block_is_served_from_memory(prefix, django_capture_on_commit_callbacks, django_assert_num_queries):
+    allocator = CodeAllocator(block_size=10)
+    with django_capture_on_commit_callbacks(execute=True):
+        first = allocator.allocate(Product, "product_code", "PROD")
+
+    with django_assert_num_queries(0):
+        rest = allocator.allocate(Product, "product_code", "PROD", count=9)
+
+    assert first + rest == [f"{prefix}{n:04d}" for n in range(1, 11)]
+    assert CodeCounter.objects.get(key=prefix).value == 10
+
+
+def test_uncommitted_block_is_not_reused(prefix):
+    allocator = CodeAllocator(block_size=10)
+    first = allocator.allocate(Product, "product_code", "PROD")
+    second = allocator.allocate(Product, "product_code", "PROD")
+    assert first != second
+    assert CodeCounter.objects.get(key=prefix).value == 20
+
+
+def test_counter_starts_after_existing_codes(prefix):
+    category = Category.objects.create(name="Bakery")
+    Product.objects.create(name="Legacy", price=10, category=category, product_code=f"{prefix}0042")
+
+    products = assign_codes([Product(name=f"Bulk {i}", price=1, category=category) for i in range(3)],
+                            "product_code", "PROD")
+
+    assert [p.product_code for p in products] == [f"{prefix}{n:04d}" for n in (43, 44, 45)]
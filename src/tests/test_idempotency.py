@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from src.catalog.models import Category, Product
+from src.core.models import IdempotencyKey, OutboxEvent
+from src.orders.models import Order
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(email="buyer@test.com", phone="0713000000")
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def product():
+    return Product.objects.create(name="Bread", price=50, category=Category.objects.create(name="Bakery"))
+
+
+def post_order(client, product, key, quantity=1):
+    return client.post(
+        reverse("order-list"),
+        {"items": [{"product_id": product.id, "quantity": quantity}]},
+        format="json",
+        HTTP_IDEMPOTENCY_KEY=key,
+    )
+
+
+def test_retry_replays_original_response(client, product):
+    first = post_order(client, product, "retry-1")
+    second = post_order(client, product, "retry-1")
+
+    assert first.status_code == second.status_code == status.HTTP_201_CREATED
+    assert second.data == first.data
+    assert second["Idempotent-Replayed"] == "true"
+    assert Order.objects.count() == 1
+    assert OutboxEvent.objects.count() == 1
+
+
+def test_requests_without_key_are_not_deduplicated(client, product):
+    client.post(reverse("order-list"), {"items": [{"product_id": product.id, "quantity": 1}]}, format="json")
+    client.post(reverse("order-list"), {"items": [{"product_id": product.id, "quantity": 1}]}, format="json")
+
+    assert Order.objects.count() == 2
+    assert not IdempotencyKey.objects.exists()
+
+
+def test_key_reused_with_different_body_is_rejected(client, product):
+    post_order(client, product, "reused")
+
+    response = post_order(client, product, "reused", quantity=2)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert Order.objects.count() == 1
+
+
+def test_keys_are_scoped_per_user(client, product):
+    other = APIClient()
+    other.force_authenticate(User.objects.create_user(email="other@test.com", phone="0713000001"))
+
+    post_order(client, product, "shared")
+    response = post_order(other, product, "shared")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not response.has_header("Idempotent-Replayed")
+    assert Order.objects.count() == 2
+
+
+def test_in_flight_duplicate_gets_conflict(client, product, settings):
+    settings.IDEMPOTENCY_WAIT_SECONDS = 0
+    post_order(client, product, "in-flight")
+    IdempotencyKey.objects.update(status_code=None, response_body=None, locked_at=timezone.now())
+
+    response = post_order(client, product, "in-flight")
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response["Retry-After"] == "1"
+    assert Order.objects.count() == 1
+
+
+def test_abandoned_claim_is_taken_over(client, product):
+    post_order(client, product, "abandoned")
+    IdempotencyKey.objects.update(status_code=None, locked_at=timezone.now() - timedelta(hours=1))
+
+    response = post_order(client, product, "abandoned")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert IdempotencyKey.objects.get().status_code == status.HTTP_201_CREATED
+
+
+def test_failed_request_releases_key(client, product):
+    response = client.post(
+        reverse("order-list"),
+        {"items": [{"product_id": 999, "quantity": 1}]},
+        format="json",
+        HTTP_IDEMPOTENCY_KEY="bad-request",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not IdempotencyKey.objects.exists()
+
+
+def test_purge_deletes_only_expired_keys(client, product):
+    for key in ("old-1", "old-2", "live"):
+        post_order(client, product, key)
+    IdempotencyKey.objects.exclude(key="live").update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    call_command("purge_idempotency_keys", "--batch-size", "1")
+
+    assert list(IdempotencyKey.objects.values_list("key", flat=True)) == ["live"]
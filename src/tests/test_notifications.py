@@ -0,0 +1,95 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.utils import timezone
+
+from src.catalog.models import Category, Product
+from src.core.models import AdminDigestEntry
+from src.core.notifications import flush_admin_digest, notify_order_placed
+from src.orders.models import Order, OrderProducts
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def digest_settings(settings):
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    settings.ADMIN_DIGEST_MAX_ORDERS = 3
+    settings.ADMIN_DIGEST_MAX_AGE_SECONDS = 300
+
+
+@pytest.fixture
+def admins():
+    return [
+        User.objects.create_user(email=f"admin{i}@test.com", phone=f"071000000{i}", role=User.Role.ADMIN)
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def make_order():
+    customer = User.objects.create_user(email="buyer@test.com", phone="0722222222", first_name="Jane")
+    category = Category.objects.create(name="Bakery")
+    products = [Product.objects.create(name=f"Bun {i}", price=10, category=category) for i in range(5)]
+
+    def make():
+        order = Order.objects.create(customer=customer, total=50)
+        OrderProducts.objects.bulk_create(
+            OrderProducts(order=order, product=product, price=10, quantity=1) for product in products
+        )
+        return Order.objects.get(pk=order.pk)
+
+    return make
+
+
+def test_admin_emails_are_batched_into_digests(admins, make_order, mocker):
+    mocker.patch("src.core.notifications.africastalking_client.send_sms", return_value={"status": "mocked"})
+    send_messages = mocker.spy(EmailBackend, "send_messages")
+
+    for _ in range(2):
+        notify_order_placed(make_order())
+    assert mail.outbox == []
+
+    notify_order_placed(make_order())
+    assert len(mail.outbox) == 1
+    assert send_messages.call_count == 1
+    digest = mail.outbox[0]
+    assert sorted(digest.to) == ["admin0@test.com", "admin1@test.com"]
+    assert digest.body.count("Order Code:") == 3
+    assert " - Bun 4 x 1 @ 10" in digest.body
+    assert AdminDigestEntry.objects.count() == 0
+
+
+def test_stale_digest_is_flushed_over_one_connection(admins, make_order, mocker, settings):
+    settings.ADMIN_DIGEST_MAX_ORDERS = 2
+    settings.ADMIN_DIGEST_MAX_AGE_SECONDS = 60
+    mocker.patch("src.core.notifications.africastalking_client.send_sms", return_value={"status": "mocked"})
+    mocker.patch("src.core.notifications.flush_admin_digest")
+    for _ in range(5):
+        notify_order_placed(make_order())
+    mocker.stopall()
+    send_messages = mocker.spy(EmailBackend, "send_messages")
+
+    AdminDigestEntry.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+    assert flush_admin_digest() == 5
+
+    assert send_messages.call_count == 1
+    assert [m.body.count("Order Code:") for m in mail.outbox] == [2, 2, 1]
+
+
+def test_young_digest_waits(admins, make_order, mocker):
+    mocker.patch("src.core.notifications.africastalking_client.send_sms", return_value={"status": "mocked"})
+    notify_order_placed(make_order())
+    assert flush_admin_digest() == 0
+    assert flush_admin_digest(force=True) == 1
+
+
+def test_order_items_are_prefetched(admins, make_order, mocker, django_assert_max_num_queries):
+    mocker.patch("src.core.notifications.africastalking_client.send_sms", return_value={"status": "mocked"})
+    order = make_order()
+    with django_assert_max_num_queries(5):
+        notify_order_placed(order)
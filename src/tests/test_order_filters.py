@@ -0,0 +1,108 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from src.orders.filters import OrderFilter
+from src.orders.models import Order
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customer():
+    return User.objects.create_user(email="buyer@test.com", phone="0716000000")
+
+
+@pytest.fixture
+def orders(customer):
+    now = timezone.now()
+    rows = [
+        (Order.Status.DELIVERED, 100, 40),
+        (Order.Status.PENDING, 250, 10),
+        (Order.Status.CANCELED, 75, 5),
+        (Order.Status.DELIVERED, 500, 1),
+    ]
+    created = []
+    for order_status, total, days_ago in rows:
+        order = Order.objects.create(customer=customer, status=order_status, total=total)
+        Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=days_ago))
+        created.append(order)
+    return created
+
+
+def list_ids(client, **params):
+    response = client.get(reverse("order-list"), params)
+    assert response.status_code == status.HTTP_200_OK
+    return [row["id"] for row in response.data["results"]]
+
+
+def test_order_history_filters(customer, orders):
+    client = APIClient()
+    client.force_authenticate(customer)
+    since = (timezone.now() - timedelta(days=20)).isoformat()
+
+    assert list_ids(client, created_after=since) == [orders[3].id, orders[2].id, orders[1].id]
+    assert list_ids(client, created_before=since) == [orders[0].id]
+    assert list_ids(client, status="DELIVERED") == [orders[3].id, orders[0].id]
+    assert list_ids(client, status=["DELIVERED", "CANCELED"]) == [orders[3].id, orders[2].id, orders[0].id]
+    assert list_ids(client, min_total=Decimal("90"), max_total=300) == [orders[1].id, orders[0].id]
+    assert list_ids(client, status="DELIVERED", created_after=since, min_total=200) == [orders[3].id]
+
+
+def test_customers_cannot_filter_into_other_histories(customer, orders):
+    other = User.objects.create_user(email="other@test.com", phone="0716000001")
+    client = APIClient()
+    client.force_authenticate(other)
+
+    assert list_ids(client, customer=customer.id) == []
+
+
+def test_invalid_filter_values_are_rejected(customer):
+    client = APIClient()
+    client.force_authenticate(customer)
+
+    assert client.get(reverse("order-list"), {"status": "LOST"}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(reverse("order-list"), {"created_after": "yesterday"}).status_code == 400
+
+
+def plan(params, queryset):
+    queryset = OrderFilter(params, queryset=queryset).qs.order_by("-created_at", "-id")
+    if connection.vendor == "postgresql":
+        # Test tables are tiny, so let the planner show which index it would use.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"created_after": "2026-01-01T00:00:00Z"},
+    {"created_after": "2026-01-01T00:00:00Z", "created_before": "2026-02-01T00:00:00Z"},
+    {"min_total": "10", "max_total": "100"},
+])
+def test_customer_history_uses_live_customer_index(customer, params):
+    assert "order_live_customer_idx" in plan(params, Order.objects.filter(customer=customer))
+
+
+def test_customer_status_range_query_uses_a_live_index(customer):
+    params = {"created_after": "2026-01-01T00:00:00Z", "status": ["DELIVERED"]}
+    explained = plan(params, Order.objects.filter(customer=customer))
+    assert "order_live_customer_idx" in explained or "order_live_status_idx" in explained
+
+
+@pytest.mark.parametrize("params", [
+    {"status": ["DELIVERED"]},
+    {"status": ["PENDING"], "created_after": "2026-01-01T00:00:00Z"},
+    {"status": ["PENDING", "CANCELED"], "max_total": "100"},
+])
+def test_support_status_queries_use_live_status_index(params):
+    assert "order_live_status_idx" in plan(params, Order.objects.all())
@@ -1,12 +1,17 @@
+import json
 import pytest
 from decimal import Decimal
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from src.catalog.models import Category, Product
 from src.orders.models import Order, OrderProducts
+from src.orders.views import OrderViewSet
+from src.core.outbox import dispatch_pending
 
 pytestmark = pytest.mark.django_db
 
@@ -64,7 +69,7 @@ def test_create_order_with_items(auth_client, user, product, mocker):
         ]
     }
 
-    mocked_notify = mocker.patch("src.orders.serializers.notify_order_placed")
+    mocked_notify = mocker.patch("src.orders.events.notify_order_placed")
 
     response = auth_client.post(url, payload, format="json")
 
@@ -80,6 +85,8 @@ def test_create_order_with_items(auth_client, user, product, mocker):
     assert Decimal(data["total"]) == order.total
     assert data["items"][0]["quantity"] == 2
 
+    mocked_notify.assert_not_called()
+    assert dispatch_pending() == (1, 0)
     mocked_notify.assert_called_once_with(order)
 
 
@@ -90,7 +97,7 @@ def test_order_item_price_is_set(auth_client, product, mocker):
             {"product_id": product.id, "quantity": 3}
         ]
     }
-    mocker.patch("src.orders.serializers.notify_order_placed")
+    mocker.patch("src.orders.events.notify_order_placed")
 
     response = auth_client.post(url, payload, format="json")
     assert response.status_code == 201
@@ -101,3 +108,126 @@ def test_order_item_price_is_set(auth_client, product, mocker):
     assert order_item.price == product.price
     assert order.total == Decimal(response.data["total"])
     assert order.total == product.price * 3
+
+
+def test_export_orders_includes_items_without_n_plus_one(auth_client, user, product, monkeypatch,
+                                                        django_assert_num_queries):
+    monkeypatch.setattr(OrderViewSet, "export_chunk_size", 2)
+    for quantity in range(1, 4):
+        order = Order.objects.create(customer=user)
+        OrderProducts.objects.create(order=order, product=product, price=product.price, quantity=quantity)
+    Order.objects.create(customer=User.objects.create_user(email="other@test.com", phone="0700000000"))
+
+    response = auth_client.get(reverse("order-export"))
+    with django_assert_num_queries(5):
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    assert len(rows) == 3
+    assert all(row["customer_id"] == user.id for row in rows)
+    assert [row["items"][0]["quantity"] for row in rows] == [1, 2, 3]
+
+
+def test_list_orders_newest_first_with_cursor(auth_client, user):
+    orders = [Order.objects.create(customer=user) for _ in range(3)]
+
+    response = auth_client.get(reverse("order-list"), {"page_size": 2})
+    assert [row["id"] for row in response.data["results"]] == [orders[2].id, orders[1].id]
+
+    response = auth_client.get(response.data["next"])
+    assert [row["id"] for row in response.data["results"]] == [orders[0].id]
+    assert response.data["next"] is None
+
+
+def test_order_list_and_detail_conditional_get(auth_client, user, product, mocker):
+    mocker.patch("src.orders.events.notify_order_placed")
+    order = Order.objects.create(customer=user)
+    list_url = reverse("order-list")
+    detail_url = reverse("order-detail", args=[order.id])
+
+    listed = auth_client.get(list_url)
+    detail = auth_client.get(detail_url)
+    assert detail["Last-Modified"]
+    assert auth_client.get(list_url, HTTP_IF_NONE_MATCH=listed["ETag"]).status_code == 304
+    assert auth_client.get(detail_url, HTTP_IF_NONE_MATCH=detail["ETag"]).status_code == 304
+    assert auth_client.get(detail_url, HTTP_IF_MODIFIED_SINCE=detail["Last-Modified"]).status_code == 304
+
+    auth_client.post(list_url, {"items": [{"product_id": product.id, "quantity": 1}]}, format="json")
+    assert auth_client.get(list_url, HTTP_IF_NONE_MATCH=listed["ETag"]).status_code == 200
+
+
+def test_create_order_query_count_is_independent_of_item_count(auth_client, category, mocker):
+    mocker.patch("src.orders.events.notify_order_placed")
+    products = [Product.objects.create(name=f"Bun {i}", price=i + 1, category=category) for i in range(50)]
+    url = reverse("order-list")
+    auth_client.post(url, {"items": [{"product_id": products[0].id, "quantity": 1}]}, format="json")
+
+    with CaptureQueriesContext(connection) as single:
+        response = auth_client.post(url, {"items": [{"product_id": products[0].id, "quantity": 1}]}, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+    payload = {"items": [{"product_id": p.id, "quantity": 2} for p in products]}
+    with CaptureQueriesContext(connection) as many:
+        response = auth_client.post(url, payload, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(many) == len(single) <= 16
+    assert len(response.data["items"]) == 50
+    assert Decimal(response.data["total"]) == sum(p.price * 2 for p in products)
+    assert OrderProducts.objects.filter(order_id=response.data["id"]).count() == 50
+
+
+def test_create_order_reports_all_unknown_products(auth_client, product, mocker):
+    mocked_notify = mocker.patch("src.orders.events.notify_order_placed")
+    payload = {"items": [
+        {"product_id": 998, "quantity": 1},
+        {"product_id": product.id, "quantity": 1},
+        {"product_id": 999, "quantity": 1},
+    ]}
+
+    response = auth_client.post(reverse("order-list"), payload, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "998, 999" in str(response.data["items"])
+    assert Order.objects.count() == 0
+    mocked_notify.assert_not_called()
+
+
+def _create_orders(customer, product, count, items_per_order=3):
+    for _ in range(count):
+        order = Order.objects.create(customer=customer)
+        OrderProducts.objects.bulk_create(
+            OrderProducts(order=order, product=product, price=product.price, quantity=1)
+            for _ in range(items_per_order)
+        )
+
+
+@pytest.mark.parametrize("order_count", [1, 25])
+def test_order_list_query_budget(auth_client, user, product, order_count, django_assert_max_num_queries):
+    _create_orders(user, product, order_count)
+
+    # etag aggregate + page + prefetched items
+    with django_assert_max_num_queries(3):
+        response = auth_client.get(reverse("order-list"))
+
+    assert len(response.data["results"]) == order_count
+    assert all(len(row["items"]) == 3 for row in response.data["results"])
+
+
+def test_order_list_query_budget_for_admin(api_client, user, product, django_assert_max_num_queries):
+    admin = User.objects.create_user(email="admin@test.com", phone="0711111111", role=User.Role.ADMIN)
+    _create_orders(user, product, 25)
+    api_client.force_authenticate(user=admin)
+
+    with django_assert_max_num_queries(3):
+        response = api_client.get(reverse("order-list"))
+    assert len(response.data["results"]) == 25
+
+
+def test_order_detail_query_budget(auth_client, user, product, django_assert_max_num_queries):
+    _create_orders(user, product, 1, items_per_order=20)
+    order = Order.objects.get()
+
+    # etag lookup + order + prefetched items
+    with django_assert_max_num_queries(3):
+        response = auth_client.get(reverse("order-detail", args=[order.id]))
+    assert len(response.data["items"]) == 20
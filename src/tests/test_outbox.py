@@ -0,0 +1,71 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+
+from src.core.models import OutboxEvent
+from src.core.outbox import HANDLERS, dispatch_pending, enqueue, outbox_stats
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def handler():
+    calls = []
+
+    def deliver(payload):
+        calls.append(payload)
+        if payload.get("fail"):
+            raise RuntimeError("provider down")
+
+    HANDLERS["test.event"] = deliver
+    yield calls
+    HANDLERS.pop("test.event")
+
+
+def test_dispatch_delivers_pending_events(handler):
+    event = enqueue("test.event", {"n": 1})
+
+    assert dispatch_pending() == (1, 0)
+    assert handler == [{"n": 1}]
+    event.refresh_from_db()
+    assert event.status == OutboxEvent.Status.DELIVERED
+    assert event.attempts == 1
+    assert dispatch_pending() == (0, 0)
+
+
+def test_failed_delivery_is_retried_with_backoff(handler, settings):
+    settings.OUTBOX_MAX_ATTEMPTS = 2
+    event = enqueue("test.event", {"fail": True})
+
+    assert dispatch_pending() == (0, 1)
+    event.refresh_from_db()
+    assert event.status == OutboxEvent.Status.PENDING
+    assert event.available_at > timezone.now()
+    assert "provider down" in event.last_error
+
+    OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+    assert dispatch_pending() == (0, 1)
+    event.refresh_from_db()
+    assert event.status == OutboxEvent.Status.FAILED
+    assert outbox_stats()["failed"] == 1
+
+
+def test_expired_lease_is_delivered_again(handler):
+    event = enqueue("test.event", {"n": 1})
+    OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now() + timedelta(minutes=5))
+    assert dispatch_pending() == (0, 0)
+
+    OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now() - timedelta(seconds=1))
+    assert dispatch_pending() == (1, 0)
+
+
+def test_dispatch_outbox_command_reports_stats(handler):
+    enqueue("test.event", {"n": 1})
+    out = StringIO()
+    call_command("dispatch_outbox", "--stats", stdout=out)
+    assert "pending=1" in out.getvalue()
+
+    call_command("dispatch_outbox", stdout=StringIO())
+    assert outbox_stats()["pending"] == 0
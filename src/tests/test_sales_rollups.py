@@ -0,0 +1,211 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from src.catalog.models import Category, Product
+from src.orders.models import CategoryDailySales, Order, OrderProducts, ProductDailySales
+from src.orders.sales import verify_sales
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def buyer():
+    return User.objects.create_user(email="buyer@test.com", phone="0711000000", password="pass1234")
+
+
+@pytest.fixture
+def admin():
+    return User.objects.create_user(email="admin@test.com", phone="0711000001", password="pass1234", role="ADMIN")
+
+
+@pytest.fixture
+def catalog():
+    food = Category.objects.create(name="Food")
+    bakery = Category.objects.create(name="Bakery", parent=food)
+    dairy = Category.objects.create(name="Dairy", parent=food)
+    return {
+        "food": food,
+        "bakery": bakery,
+        "dairy": dairy,
+        "bread": Product.objects.create(name="Bread", price=50, category=bakery),
+        "milk": Product.objects.create(name="Milk", price=80, category=dairy),
+    }
+
+
+def place_order(client, *items):
+    response = client.post(
+        reverse("order-list"),
+        {"items": [{"product_id": product.id, "quantity": quantity} for product, quantity in items]},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return Order.objects.get(pk=response.data["id"])
+
+
+def sales(model, **filters):
+    return {
+        (getattr(row, f"{model.rollup_key}_id"), row.status): (row.revenue, row.order_count, row.units)
+        for row in model.objects.filter(**filters)
+    }
+
+
+def test_orders_update_product_and_subtree_rollups(buyer, catalog):
+    client = APIClient()
+    client.force_authenticate(buyer)
+    bread, milk = catalog["bread"], catalog["milk"]
+
+    place_order(client, (bread, 2), (milk, 1), (bread, 1))
+    place_order(client, (milk, 3))
+
+    today = timezone.localdate()
+    assert sales(ProductDailySales, day=today) == {
+        (bread.id, "PENDING"): (Decimal("150.00"), 1, 3),
+        (milk.id, "PENDING"): (Decimal("320.00"), 2, 4),
+    }
+    category_sales = sales(CategoryDailySales, day=today)
+    assert category_sales[(catalog["food"].id, "PENDING")] == (Decimal("470.00"), 2, 7)
+    assert category_sales[(catalog["bakery"].id, "PENDING")] == (Decimal("150.00"), 1, 3)
+    assert category_sales[(catalog["dairy"].id, "PENDING")] == (Decimal("320.00"), 2, 4)
+    assert verify_sales(OrderProducts, ProductDailySales, CategoryDailySales) == ([], [])
+
+
+def test_status_change_moves_sales_between_buckets(buyer, catalog):
+    client = APIClient()
+    client.force_authenticate(buyer)
+    order = place_order(client, (catalog["bread"], 2))
+
+    order.status = Order.Status.DELIVERED
+    order.save()
+
+    rows = sales(ProductDailySales)
+    assert rows[(catalog["bread"].id, "PENDING")] == (0, 0, 0)
+    assert rows[(catalog["bread"].id, "DELIVERED")] == (Decimal("100.00"), 1, 2)
+    assert verify_sales(OrderProducts, ProductDailySales, CategoryDailySales) == ([], [])
+
+
+def test_status_change_after_recategorising_keeps_the_original_subtree(buyer, catalog):
+    client = APIClient()
+    client.force_authenticate(buyer)
+    bread, bakery, dairy = catalog["bread"], catalog["bakery"], catalog["dairy"]
+    order = place_order(client, (bread, 2))
+    bread.category = dairy
+    bread.save()
+
+    order.status = Order.Status.CANCELED
+    order.save()
+
+    rows = sales(CategoryDailySales)
+    assert rows[(bakery.id, "PENDING")] == (0, 0, 0)
+    assert rows[(bakery.id, "CANCELED")] == (Decimal("100.00"), 1, 2)
+    assert (dairy.id, "CANCELED") not in rows
+    assert verify_sales(OrderProducts, ProductDailySales, CategoryDailySales) == ([], [])
+
+
+def test_status_change_skips_deleted_categories(buyer, catalog):
+    client = APIClient()
+    client.force_authenticate(buyer)
+    bread, bakery = catalog["bread"], catalog["bakery"]
+    order = place_order(client, (bread, 1))
+    bread.category = catalog["dairy"]
+    bread.save()
+    bakery.delete()
+
+    order.status = Order.Status.DELIVERED
+    order.save()
+
+    assert sales(CategoryDailySales)[(catalog["food"].id, "DELIVERED")] == (Decimal("50.00"), 1, 1)
+    assert verify_sales(OrderProducts, ProductDailySales, CategoryDailySales) == ([], [])
+
+
+def test_rollups_apply_thousands_of_keys(catalog):
+    start = timezone.localdate()
+    deltas = {
+        (start - timedelta(days=offset), "PENDING", product.id): [Decimal("10.00"), 1, 2]
+        for offset in range(1500) for product in (catalog["bread"], catalog["milk"])
+    }
+
+    ProductDailySales.objects.apply(deltas)
+    ProductDailySales.objects.apply(dict(list(deltas.items())[:1000]), sign=-1)
+
+    assert ProductDailySales.objects.count() == 3000
+    assert ProductDailySales.objects.aggregate(units=Sum("units"), orders=Sum("order_count")) == {
+        "units": 4000, "orders": 2000,
+    }
+
+
+def test_rebuild_command_repairs_drift(buyer, catalog):
+    client = APIClient()
+    client.force_authenticate(buyer)
+    place_order(client, (catalog["bread"], 1), (catalog["milk"], 1))
+    ProductDailySales.objects.update(units=99)
+    CategoryDailySales.objects.all().delete()
+
+    with pytest.raises(Exception, match="out of date for 2 product and 3 category rows"):
+        call_command("rebuild_sales_rollups", "--verify")
+
+    call_command("rebuild_sales_rollups")
+    call_command("rebuild_sales_rollups", "--verify")
+    assert sales(ProductDailySales)[(catalog["bread"].id, "PENDING")] == (Decimal("50.00"), 1, 1)
+
+
+def test_analytics_endpoints_are_admin_only(buyer):
+    client = APIClient()
+    client.force_authenticate(buyer)
+
+    assert client.get(reverse("order-analytics-top")).status_code == status.HTTP_403_FORBIDDEN
+    assert client.get(reverse("order-analytics-timeseries")).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_analytics_timeseries_and_top(buyer, admin, catalog, django_assert_max_num_queries):
+    client = APIClient()
+    client.force_authenticate(buyer)
+    place_order(client, (catalog["bread"], 5))
+    delivered = place_order(client, (catalog["milk"], 1))
+    delivered.status = Order.Status.DELIVERED
+    delivered.save()
+
+    client.force_authenticate(admin)
+    today = timezone.localdate().isoformat()
+    with django_assert_max_num_queries(2):
+        response = client.get(reverse("order-analytics-timeseries"), {"category": catalog["food"].id})
+    assert response.status_code == status.HTTP_200_OK
+    assert [(str(row["day"]), row["revenue"], row["orders"], row["units"]) for row in response.data["results"]] == [
+        (today, Decimal("330.00"), 2, 6),
+    ]
+
+    response = client.get(reverse("order-analytics-top"), {"metric": "units"})
+    assert [(row["name"], row["units"]) for row in response.data["results"]] == [("Bread", 5), ("Milk", 1)]
+
+    response = client.get(reverse("order-analytics-top"), {"status": "DELIVERED"})
+    assert [row["name"] for row in response.data["results"]] == ["Milk"]
+
+    response = client.get(reverse("order-analytics-top"), {"by": "category", "depth": 1, "limit": 1})
+    assert [row["name"] for row in response.data["results"]] == ["Bakery"]
+
+
+def test_analytics_rejects_bad_parameters(admin):
+    client = APIClient()
+    client.force_authenticate(admin)
+
+    for url, params in [
+        (reverse("order-analytics-timeseries"), {}),
+        (reverse("order-analytics-timeseries"), {"product": "x"}),
+        (reverse("order-analytics-top"), {"start": "2026-13-01"}),
+        (reverse("order-analytics-top"), {"start": "2020-01-01", "end": "2026-01-01"}),
+        (reverse("order-analytics-top"), {"metric": "profit"}),
+        (reverse("order-analytics-top"), {"status": "LOST"}),
+    ]:
+        response = client.get(url, params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "detail" in response.data
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from src.core.africatalking import ATClient, FakeSMSBackend, RateLimiter
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def backend():
+    return FakeSMSBackend()
+
+
+@pytest.fixture
+def client(backend, sleeps, settings):
+    settings.AFRICA_TALKING_CODE = "12345"
+    return ATClient(backend=backend, rate=0, max_recipients=2, max_retries=2, sleep=sleeps.append)
+
+
+def test_identical_messages_are_coalesced(client, backend):
+    client.queue_sms("+254711000001", "Sale today")
+    client.queue_sms(["+254711000002", "+254711000003"], "Sale today")
+    client.queue_sms("+254711000001", "Sale today")
+    client.queue_sms("+254711000009", "Your order shipped")
+    assert client.counters["queued"] == 4
+
+    client.flush()
+
+    assert backend.sent == [
+        ("Sale today", ["+254711000001", "+254711000002"]),
+        ("Sale today", ["+254711000003"]),
+        ("Your order shipped", ["+254711000009"]),
+    ]
+    assert client.counters == {"queued": 0, "delivered": 4, "failed": 0}
+
+
+def test_transient_failures_are_retried_with_jitter(client, backend, sleeps, settings):
+    settings.SMS_RETRY_BASE_SECONDS = 1
+    backend.fail_next = 2
+
+    result = client.send_sms("+254711000001", "hello")
+
+    assert result["SMSMessageData"]["Recipients"][0]["statusCode"] == 101
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1 and 0 <= sleeps[1] <= 2
+    assert client.counters["delivered"] == 1
+
+
+def test_exhausted_retries_are_counted_as_failed(client, backend):
+    backend.fail_next = 5
+
+    result = client.send_sms(["+254711000001", "+254711000002"], "hello")
+
+    assert result["status"] == "failed"
+    assert client.counters == {"queued": 0, "delivered": 0, "failed": 2}
+
+
+def test_concurrent_senders_get_their_own_results(client, backend):
+    send = backend.send
+
+    def reject(message, recipients, sender_id=None):
+        if "+254711000002" in recipients:
+            raise ConnectionError("rejected")
+        return send(message, recipients, sender_id)
+
+    backend.send = reject
+    flush = client.flush
+    queued, first_done = threading.Event(), threading.Event()
+
+    def late_flush():
+        # the second sender queues, then lets the first sender's flush take its message
+        if threading.current_thread().name == "second":
+            queued.set()
+            first_done.wait(5)
+        return flush()
+
+    client.flush = late_flush
+    results = {}
+
+    def sender(number, message):
+        results[threading.current_thread().name] = client.send_sms(number, message)
+
+    second = threading.Thread(target=sender, args=("+254711000002", "Order 2 shipped"), name="second")
+    second.start()
+    assert queued.wait(5)
+    sender("+254711000001", "Order 1 shipped")
+    first_done.set()
+    second.join(5)
+
+    assert results[threading.current_thread().name]["SMSMessageData"]["Recipients"][0]["number"] == "+254711000001"
+    assert results["second"]["status"] == "failed"
+    assert backend.sent == [("Order 1 shipped", ["+254711000001"])]
+    assert client.counters == {"queued": 0, "delivered": 1, "failed": 1}
+
+
+def test_rate_limiter_spaces_out_sends():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+
+    assert sleeps == [0.5, 0.5, 0.5, 0.5]
+    assert now[0] == pytest.approx(2.0)
+
+
+def test_fake_backend_keeps_only_recent_sends():
+    backend = FakeSMSBackend(max_sent=3)
+    for i in range(5):
+        backend.send(f"message {i}", ["+254711000001"])
+
+    assert [message for message, _ in backend.sent] == ["message 2", "message 3", "message 4"]
+
+
+def test_missing_credentials_are_reported(settings, caplog):
+    settings.SMS_BACKEND = "africastalking"
+    settings.AFRICA_TALKING_USERNAME = None
+
+    client = ATClient()
+
+    assert isinstance(client.sms, FakeSMSBackend)
+    assert "AFRICA_TALKING_APIKEY is not set" in caplog.text
+
+
+def test_unknown_backend_is_rejected(settings):
+    settings.SMS_BACKEND = "carrier-pigeon"
+
+    with pytest.raises(ImproperlyConfigured):
+        ATClient()
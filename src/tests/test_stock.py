@@ -0,0 +1,138 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from src.catalog.cache import catalog_version
+from src.catalog.models import Category, InsufficientStock, Product
+from src.orders.models import Order
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def client():
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(email="buyer@test.com", phone="0712000000"))
+    return client
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name="Bakery")
+
+
+def stock_of(product):
+    return Product.objects.values_list("stock", flat=True).get(pk=product.pk)
+
+
+def place_order(client, *items):
+    return client.post(
+        reverse("order-list"),
+        {"items": [{"product_id": product.id, "quantity": quantity} for product, quantity in items]},
+        format="json",
+    )
+
+
+def test_order_reserves_stock_and_rejects_overselling(client, category):
+    bread = Product.objects.create(name="Bread", price=50, category=category, stock=5)
+
+    assert place_order(client, (bread, 2), (bread, 1)).status_code == status.HTTP_201_CREATED
+    assert stock_of(bread) == 2
+
+    response = place_order(client, (bread, 3))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert f"Insufficient stock for product ids: {bread.id}" in str(response.data)
+    assert Order.objects.count() == 1
+    assert stock_of(bread) == 2
+
+
+def test_reservation_is_all_or_nothing(category):
+    bread = Product.objects.create(name="Bread", price=50, category=category, stock=5)
+    milk = Product.objects.create(name="Milk", price=80, category=category, stock=1)
+    salt = Product.objects.create(name="Salt", price=10, category=category)
+
+    with pytest.raises(InsufficientStock) as exc:
+        Product.objects.reserve_stock({bread.id: 2, milk.id: 2, salt.id: 100})
+
+    assert exc.value.product_ids == [milk.id]
+    assert (stock_of(bread), stock_of(milk), stock_of(salt)) == (5, 1, None)
+
+    Product.objects.reserve_stock({bread.id: 5, salt.id: 100})
+    assert (stock_of(bread), stock_of(salt)) == (0, None)
+
+
+def test_reservations_span_thousands_of_products(category):
+    Product.objects.bulk_create(
+        [Product(name=f"Bun {i}", price=1, category=category, stock=3) for i in range(1500)]
+    )
+    quantities = {pk: 2 for pk in Product.objects.values_list("pk", flat=True)}
+
+    Product.objects.reserve_stock(quantities)
+    assert set(Product.objects.values_list("stock", flat=True)) == {1}
+    with pytest.raises(InsufficientStock):
+        Product.objects.reserve_stock(quantities)
+
+    Product.objects.release_stock(quantities)
+    assert set(Product.objects.values_list("stock", flat=True)) == {3}
+
+
+def test_only_availability_changes_invalidate_cached_product_reads(client, category):
+    bread = Product.objects.create(name="Bread", price=50, category=category, stock=3)
+    url = reverse("product-detail", args=[bread.id])
+    assert client.get(url).data["stock"] == 3
+    version = catalog_version()
+
+    place_order(client, (bread, 1))
+    assert catalog_version() == version
+
+    order_id = place_order(client, (bread, 2)).data["id"]
+    assert catalog_version() != version
+    assert client.get(url).data["stock"] == 0
+
+    order = Order.objects.get(pk=order_id)
+    order.status = Order.Status.CANCELED
+    order.save()
+    assert client.get(url).data["stock"] == 2
+
+
+def test_cancel_and_return_restock_once(client, category):
+    bread = Product.objects.create(name="Bread", price=50, category=category, stock=5)
+    order = Order.objects.get(pk=place_order(client, (bread, 4)).data["id"])
+
+    order.status = Order.Status.CANCELED
+    order.save()
+    assert stock_of(bread) == 5
+
+    order.status = Order.Status.RETURNED
+    order.save()
+    assert stock_of(bread) == 5
+
+    order.status = Order.Status.PENDING
+    order.save()
+    assert stock_of(bread) == 1
+
+
+def test_saving_a_stale_product_keeps_reserved_stock(category):
+    bread = Product.objects.create(name="Bread", price=50, category=category, stock=5)
+    Product.objects.reserve_stock({bread.id: 2})
+
+    bread.name = "Sourdough"
+    bread.save()
+
+    assert stock_of(bread) == 3
+    assert Product.objects.get(pk=bread.pk).name == "Sourdough"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_checkout_benchmark_never_oversells(capsys):
+    call_command("benchmark_checkout", "--workers", "1", "--checkouts", "20", "--stock", "7")
+
+    out = capsys.readouterr().out
+    assert "reserved 7, sold out 13, errors 0, stock 7 -> 0" in out
+    assert "No overselling" in out
+    assert not Product.objects.exists()
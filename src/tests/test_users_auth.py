@@ -0,0 +1,311 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from src.config import authentication
+from src.config.authentication import GoogleIDTokenAuthentication
+from src.config.jwks import JWKSCache, google_key_set
+from src.config.token_cache import TokenCache, token_key
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+class UserinfoStandIn(BaseHTTPRequestHandler):
+    """
+    Answers like Google's userinfo endpoint for the tokens in `tokens`, and
+    like tokeninfo for the remaining lifetimes in `lifetimes`.
+    """
+
+    tokens = {}
+    lifetimes = {}
+    calls = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/tokeninfo":
+            lifetime = self.lifetimes.get(parse_qs(url.query).get("access_token", [""])[0])
+            self.send_response(400 if lifetime is None else 200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"expires_in": str(lifetime)} if lifetime is not None else {}).encode())
+            return
+
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        self.calls.append(token)
+        user_info = self.tokens.get(token)
+        if user_info == "down":
+            self.send_response(503)
+            self.end_headers()
+            return
+        self.send_response(200 if user_info else 401)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(user_info or {"error": "invalid_token"}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def userinfo(settings):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), UserinfoStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.GOOGLE_USERINFO_URL = f"http://127.0.0.1:{server.server_port}/userinfo"
+    settings.GOOGLE_TOKENINFO_URL = f"http://127.0.0.1:{server.server_port}/tokeninfo"
+    UserinfoStandIn.tokens = {}
+    UserinfoStandIn.lifetimes = {}
+    UserinfoStandIn.calls = []
+    authentication.token_cache.clear()
+    yield UserinfoStandIn
+    server.shutdown()
+    server.server_close()
+    authentication.token_cache.clear()
+
+
+def get_orders(token):
+    client = APIClient()
+    return client.get(reverse("order-list"), HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+def test_valid_token_is_validated_once(userinfo):
+    userinfo.tokens["good"] = {"email": "jane@test.com", "given_name": "Jane", "family_name": "Doe"}
+
+    assert get_orders("good").status_code == status.HTTP_200_OK
+    with CaptureQueriesContext(connection) as cached:
+        assert get_orders("good").status_code == status.HTTP_200_OK
+
+    assert userinfo.calls == ["good"]
+    assert User.objects.get(email="jane@test.com").first_name == "Jane"
+    assert not any(query["sql"].lstrip().upper().startswith(("INSERT", "UPDATE")) for query in cached)
+
+
+def test_invalid_token_is_negatively_cached(userinfo):
+    assert get_orders("bad").status_code == status.HTTP_403_FORBIDDEN
+    assert get_orders("bad").status_code == status.HTTP_403_FORBIDDEN
+
+    assert userinfo.calls == ["bad"]
+
+
+def test_provider_errors_are_not_cached(userinfo):
+    userinfo.tokens["flaky"] = "down"
+    assert get_orders("flaky").status_code == status.HTTP_403_FORBIDDEN
+
+    userinfo.tokens["flaky"] = {"email": "flaky@test.com"}
+    assert get_orders("flaky").status_code == status.HTTP_200_OK
+    assert userinfo.calls == ["flaky", "flaky"]
+
+
+def test_cache_ttl_is_bounded_by_token_expiry(userinfo, settings):
+    settings.GOOGLE_TOKEN_CACHE_SECONDS = 300
+    userinfo.tokens["short"] = {"email": "short@test.com", "expires_in": 0}
+
+    get_orders("short")
+    get_orders("short")
+
+    assert userinfo.calls == ["short", "short"]
+
+
+def test_cache_ttl_is_bounded_by_tokeninfo_expiry(userinfo, settings):
+    settings.GOOGLE_TOKEN_CACHE_SECONDS = 300
+    userinfo.tokens["expiring"] = {"email": "expiring@test.com"}
+    userinfo.lifetimes["expiring"] = 0
+
+    assert get_orders("expiring").status_code == status.HTTP_200_OK
+    assert get_orders("expiring").status_code == status.HTTP_200_OK
+
+    assert userinfo.calls == ["expiring", "expiring"]
+
+
+def test_malformed_expiry_fails_authentication(userinfo):
+    userinfo.tokens["odd"] = {"email": "odd@test.com", "exp": "tomorrow"}
+
+    assert get_orders("odd").status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_deleted_user_falls_back_to_provider(userinfo):
+    userinfo.tokens["good"] = {"email": "gone@test.com"}
+    get_orders("good")
+    User.objects.filter(email="gone@test.com").delete()
+
+    assert get_orders("good").status_code == status.HTTP_200_OK
+    assert len(userinfo.calls) == 2
+
+
+def test_token_cache_is_a_bounded_lru_with_expiry():
+    now = [1000.0]
+    cache = TokenCache(max_entries=2, clock=lambda: now[0])
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=10)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=10)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    now[0] += 10
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_token_cache_shares_entries_through_django_cache():
+    writer = TokenCache(shared_alias="default")
+    reader = TokenCache(shared_alias="default")
+    key = token_key("secret-token")
+
+    writer.set(key, {"user_id": 7}, ttl=60)
+
+    assert reader.get(key) == {"user_id": 7}
+    assert "secret-token" not in key
+
+
+class JWKSStandIn(BaseHTTPRequestHandler):
+    """Serves the public halves of `keys` ({kid: private key}) as a JWKS document."""
+
+    keys = {}
+    hits = 0
+
+    def do_GET(self):
+        JWKSStandIn.hits += 1
+        jwks = {"keys": [
+            {**jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key(), as_dict=True), "kid": kid, "alg": "RS256"}
+            for kid, key in self.keys.items()
+        ]}
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "public, max-age=3600")
+        self.end_headers()
+        self.wfile.write(json.dumps(jwks).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="module")
+def signing_keys():
+    return {"key-1": rsa_key(), "key-2": rsa_key()}
+
+
+@pytest.fixture
+def jwks(settings, signing_keys):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JWKSStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.GOOGLE_JWKS_URL = f"http://127.0.0.1:{server.server_port}/certs"
+    settings.GOOGLE_ID_TOKEN_AUDIENCES = ["client-id.apps.googleusercontent.com"]
+    JWKSStandIn.keys = {"key-1": signing_keys["key-1"]}
+    JWKSStandIn.hits = 0
+    google_key_set.clear()
+    authentication.token_cache.clear()
+    yield JWKSStandIn
+    server.shutdown()
+    server.server_close()
+    google_key_set.clear()
+    authentication.token_cache.clear()
+
+
+def id_token(key, kid="key-1", **claims):
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": "client-id.apps.googleusercontent.com",
+        "sub": "10769150350006150715113082367",
+        "email": "jane@test.com",
+        "email_verified": True,
+        "given_name": "Jane",
+        "iat": now,
+        "exp": now + 3600,
+        **claims,
+    }
+    return jwt.encode(payload, key, algorithm="RS256", headers={"kid": kid})
+
+
+def authenticate(token):
+    request = Request(APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+    return GoogleIDTokenAuthentication().authenticate(request)
+
+
+def test_id_token_is_verified_locally_with_cached_keys(jwks, signing_keys):
+    user, _ = authenticate(id_token(signing_keys["key-1"]))
+    again, _ = authenticate(id_token(signing_keys["key-1"], email="jane@test.com", iat=int(time.time()) - 1))
+
+    assert user.email == "jane@test.com" and user.first_name == "Jane"
+    assert again == user
+    assert jwks.hits == 1
+
+
+@pytest.mark.parametrize("claims", [
+    {"aud": "someone-else"},
+    {"iss": "accounts.google.com", "exp": int(time.time()) - 3600},
+    {"email_verified": False},
+])
+def test_invalid_id_tokens_are_rejected(jwks, signing_keys, claims):
+    with pytest.raises(exceptions.AuthenticationFailed):
+        authenticate(id_token(signing_keys["key-1"], **claims))
+
+
+def test_forged_signature_is_rejected(jwks):
+    with pytest.raises(exceptions.AuthenticationFailed):
+        authenticate(id_token(rsa_key(), kid="key-1"))
+
+
+def test_non_google_bearer_tokens_are_left_to_other_authenticators(jwks, signing_keys):
+    assert authenticate("not-a-jwt") is None
+    assert authenticate(id_token(signing_keys["key-1"], iss="https://issuer.example.com")) is None
+    assert jwks.hits == 0
+
+
+def test_rotated_key_is_fetched_on_kid_miss(jwks, signing_keys, settings):
+    settings.GOOGLE_JWKS_MIN_REFRESH_SECONDS = 0
+    authenticate(id_token(signing_keys["key-1"]))
+    jwks.keys = {"key-2": signing_keys["key-2"]}
+
+    user, _ = authenticate(id_token(signing_keys["key-2"], kid="key-2", iat=int(time.time()) - 1))
+
+    assert user.email == "jane@test.com"
+    assert jwks.hits == 2
+
+
+def test_unknown_kids_refresh_at_most_once_per_interval(jwks, signing_keys):
+    now = [0.0]
+    key_set = JWKSCache(min_refresh=60, clock=lambda: now[0])
+    key_set.get_key("key-1")
+
+    for _ in range(3):
+        with pytest.raises(Exception, match="Unknown signing key"):
+            key_set.get_key("made-up")
+    assert jwks.hits == 1
+
+    now[0] += 61
+    with pytest.raises(Exception, match="Unknown signing key"):
+        key_set.get_key("made-up")
+    assert jwks.hits == 2
+
+
+def test_token_exchange_verifies_the_id_token(jwks, signing_keys, mocker):
+    tokens = {"access_token": "access", "id_token": id_token(rsa_key()), "expires_in": 3599}
+    mocker.patch("src.users.views.requests.post").return_value.json.return_value = tokens
+
+    response = APIClient().post(reverse("user-token"), {"code": "auth-code"}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    tokens["id_token"] = id_token(signing_keys["key-1"])
+    response = APIClient().post(reverse("user-token"), {"code": "auth-code"}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert User.objects.filter(email="jane@test.com").exists()
@@ -11,6 +11,7 @@ from django.http import JsonResponse, HttpResponse
 import requests
 import jwt
 
+from src.config.jwks import KeySetError, verify_id_token
 from .serializers import UserSerializer
 from .permissions import IsOwnerOrAdmin
 
@@ -75,7 +76,10 @@ class UserViewSet(viewsets.ModelViewSet):
         if not id_token or not access_token:
             return Response({"detail": "Missing id_token or access_token"}, status=status.HTTP_400_BAD_REQUEST)
 
-        decoded = jwt.decode(id_token, options={"verify_signature": False})
+        try:
+            decoded = verify_id_token(id_token)
+        except (jwt.InvalidTokenError, KeySetError):
+            return Response({"detail": "Invalid id_token returned by provider"}, status=status.HTTP_400_BAD_REQUEST)
         email = decoded.get("email")
         first_name = decoded.get("given_name", "")
         last_name = decoded.get("family_name", "")